@@ -0,0 +1,237 @@
+"""Offline load test of the signing pipeline against a local stub backend.
+
+Starts a stub of the signing API on 127.0.0.1 with configurable latency, error
+rate and error status codes, builds Token/Crons objects on a bare Home Assistant
+instance, and fires every cron at once for each concurrency level. Reports
+throughput, latency percentiles, threads used and event-loop lag. Needs Home
+Assistant (and thus aiohttp) installed, but no network:
+
+    python benchmarks/bench_load.py --levels 1,10,100,500 --latency 50 --error-rate 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.safety_signing.api import (  # noqa: E402
+    SigningApiError,
+    async_get_api,
+    async_release_api,
+)
+from custom_components.safety_signing.balancer import SigningBalancer  # noqa: E402
+from custom_components.safety_signing.const import CONF_BATCH_WINDOW  # noqa: E402
+from custom_components.safety_signing.token import Token  # noqa: E402
+
+ACCESS_TOKEN = json.dumps(
+    {
+        "access_token": "ya29.stub",
+        "expires_in": 3599,
+        "refresh_token": "1//stub",
+        "scope": "https://www.googleapis.com/auth/drive",
+        "token_type": "Bearer",
+    }
+)
+
+
+class StubBackend:
+    """Local stand-in for the signing API."""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, statuses: list[int]) -> None:
+        """Init the stub behaviour, latencies in seconds."""
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.statuses = statuses
+        self.requests = 0
+
+    async def _delay(self) -> None:
+        """Wait like a real backend would."""
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def _error(self) -> web.Response | None:
+        """Return an error answer for error_rate of the requests."""
+        if random.random() < self.error_rate:
+            return web.Response(status=random.choice(self.statuses))
+        return None
+
+    async def auto_sign(self, request: web.Request) -> web.Response:
+        """Handle /autoSign."""
+        self.requests += 1
+        await request.read()
+        await self._delay()
+        return self._error() or web.json_response({"status": 0})
+
+    async def auto_sign_batch(self, request: web.Request) -> web.Response:
+        """Handle /autoSignBatch."""
+        self.requests += 1
+        body = await request.json()
+        await self._delay()
+        return self._error() or web.json_response(
+            {"results": [{"id": item["id"], "status": 0} for item in body["requests"]]}
+        )
+
+    async def health(self, request: web.Request) -> web.Response:
+        """Handle /health."""
+        return web.json_response({"status": "ok"})
+
+    async def async_start(self) -> tuple[web.AppRunner, str]:
+        """Serve the stub on a free local port and return its base URL."""
+        app = web.Application()
+        app.router.add_post("/api/autoSign", self.auto_sign)
+        app.router.add_post("/api/autoSignBatch", self.auto_sign_batch)
+        app.router.add_get("/api/health", self.health)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+        return runner, f"http://127.0.0.1:{port}/api"
+
+
+class LoopLagProbe:
+    """Measure how late the event loop runs a 10 ms sleep."""
+
+    def __init__(self) -> None:
+        """Init an idle probe."""
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        """Sample until cancelled."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            self.samples.append(max(0.0, time.perf_counter() - started - 0.01))
+
+    def start(self) -> None:
+        """Start sampling."""
+        self.samples = []
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _async_make_hass(config_dir: str) -> HomeAssistant:
+    """Create a bare Home Assistant instance, across core versions."""
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    return hass
+
+
+async def _async_run_level(hass: HomeAssistant, base_url: str, count: int, options: dict) -> dict:
+    """Sign with count crons at once and return the measurements."""
+    tokens = []
+    for index in range(count):
+        token = Token(hass, f"bench {index}", "54010101A1B2C3D4", f"SN{index:06d}", ACCESS_TOKEN, "12345678", "XHDO", options)
+        token.backends = [async_get_api(hass, base_url)]
+        token.balancer = SigningBalancer(token.backends)
+        tokens.append(token)
+
+    latencies: list[float] = []
+    errors = 0
+    peak_threads = threading.active_count()
+
+    async def _sign(cron) -> None:
+        nonlocal errors, peak_threads
+        started = time.perf_counter()
+        try:
+            await cron.running_cron()
+        except SigningApiError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        peak_threads = max(peak_threads, threading.active_count())
+
+    probe = LoopLagProbe()
+    probe.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(_sign(token.crons[0]) for token in tokens))
+    elapsed = time.perf_counter() - started
+    await probe.stop()
+
+    for token in tokens:
+        await async_release_api(hass, token.backends[0])
+
+    return {
+        "crons": count,
+        "throughput": count / elapsed,
+        "p50": _percentile(latencies, 0.50),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+        "errors": errors,
+        "threads": peak_threads,
+        "lag_p99": _percentile(probe.samples, 0.99),
+        "lag_max": max(probe.samples, default=0.0),
+    }
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run every concurrency level and print a report."""
+    stub = StubBackend(
+        args.latency / 1000,
+        args.jitter / 1000,
+        args.error_rate,
+        [int(status) for status in args.statuses.split(",")],
+    )
+    runner, base_url = await stub.async_start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await _async_make_hass(config_dir)
+        options = {CONF_BATCH_WINDOW: args.batch_window}
+
+        print(
+            f"{'crons':>6} {'signs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'errors':>6} {'threads':>7} {'lag p99':>8} {'lag max':>8} {'requests':>8}"
+        )
+        for level in (int(level) for level in args.levels.split(",")):
+            before = stub.requests
+            result = await _async_run_level(hass, base_url, level, options)
+            print(
+                f"{result['crons']:>6} {result['throughput']:>9.1f} "
+                f"{result['p50'] * 1000:>8.1f} {result['p95'] * 1000:>8.1f} "
+                f"{result['p99'] * 1000:>8.1f} {result['errors']:>6} {result['threads']:>7} "
+                f"{result['lag_p99'] * 1000:>8.2f} {result['lag_max'] * 1000:>8.2f} "
+                f"{stub.requests - before:>8}"
+            )
+    await runner.cleanup()
+
+
+def main() -> None:
+    """Parse the arguments and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", default="1,10,100,500", help="Comma separated cron counts")
+    parser.add_argument("--latency", type=float, default=50, help="Stub latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="Stub latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing")
+    parser.add_argument("--statuses", default="500,503", help="Status codes of the failures")
+    parser.add_argument("--batch-window", type=float, default=0.05, help="Batch window in seconds, 0 to disable")
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
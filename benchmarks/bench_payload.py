@@ -0,0 +1,75 @@
+"""Micro-benchmark of the per-press cost of building the autoSign body.
+
+Compares the body built from scratch on every press (as Crons.running_cron used
+to do) with the cached bytes crons now send. Needs nothing but the standard
+library:
+
+    python benchmarks/bench_payload.py
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+from pathlib import Path
+import timeit
+
+PAYLOAD_PY = (
+    Path(__file__).resolve().parent.parent
+    / "custom_components"
+    / "safety_signing"
+    / "payload.py"
+)
+
+GOOGLE_TOKEN = {
+    "access_token": "ya29." + "x" * 160,
+    "expires_in": 3599,
+    "refresh_token": "1//" + "y" * 100,
+    "scope": "https://www.googleapis.com/auth/drive",
+    "token_type": "Bearer",
+}
+ARGS = (GOOGLE_TOKEN, "54010101A1B2C3D4", "0101234567", "12345678", "XHDO;BHXH;THUE")
+
+
+def _load_payload_module():
+    """Import payload.py without importing the integration (and Home Assistant)."""
+    spec = importlib.util.spec_from_file_location("payload", PAYLOAD_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_every_call(google_token, token_serial, serial_number, pin, app):
+    """Build the body the way running_cron did before it was cached."""
+    request_headers = {"Content-Type": "application/json"}
+    request_body = {
+        "google_token": google_token,
+        "config": {
+            "token": {
+                "tokenSerial": token_serial,
+                "serialNumber": serial_number,
+                "pin": pin,
+                "app": json.dumps(app.split(";")),
+            }
+        },
+    }
+    return request_headers, json.dumps(request_body)
+
+
+def main() -> None:
+    """Run the benchmark and print the cost per call."""
+    payload = _load_payload_module()
+    cached = payload.build_sign_payload(*ARGS)
+    number = 200_000
+
+    cases = {
+        "rebuilt on every press": lambda: build_every_call(*ARGS),
+        "built once (first press)": lambda: payload.build_sign_payload(*ARGS),
+        "cached bytes (next presses)": lambda: cached,
+    }
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:<28} {best / number * 1e9:10.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
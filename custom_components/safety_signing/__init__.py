@@ -1,39 +1,213 @@
 """The Detailed Hello World Push integration."""
 from __future__ import annotations
 
+from functools import partial
+import json
+import logging
+import time
+
+from homeassistant.components import webhook
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.start import async_at_start
 
 from . import token
-from .const import DOMAIN
+from .api import SigningApi, async_get_api, async_release_api
+from .balancer import SigningBalancer, parse_backends
+from .const import (
+    API_URL,
+    CONF_ASYNC_MODE,
+    CONF_BACKENDS,
+    CONF_MAX_CONCURRENCY,
+    CONF_SCHEDULE,
+    CONF_WEBHOOK_ID,
+    CONF_WORKERS,
+    DATA_APIS,
+    DATA_JOBS,
+    DATA_SCHEDULER,
+    DEFAULT_DRAIN_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_WORKERS,
+    DOMAIN,
+)
+from .coordinator import SigningHealthCoordinator
+from .jobs import async_get_jobs
+from .journal import SignJournal
+from .push import SignPushChannel
+from .webhook import async_register_webhook, async_webhook_url
+from .scheduler import async_get_scheduler, parse_schedules
+from .services import async_setup_services
+
+_LOGGER = logging.getLogger(__name__)
 
 # List of platforms to support. There should be a matching .py file for each,
 # eg <cover.py> and <sensor.py>
 PLATFORMS: list[str] = ["sensor", "cover"]
 
 
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up the services of the integration."""
+    async_setup_services(hass)
+
+    # Entries are not unloaded when Home Assistant stops, the shared state is
+    # released here instead.
+    async def async_stop_jobs(event: Event) -> None:
+        """Stop scheduling and the job workers, saving the journal while it can be."""
+        if DATA_SCHEDULER in hass.data:
+            hass.data.pop(DATA_SCHEDULER).async_stop()
+        if DATA_JOBS in hass.data:
+            await hass.data.pop(DATA_JOBS).async_stop()
+
+    async def async_close_apis(event: Event) -> None:
+        """Close the sessions and push channels of every backend."""
+        apis = hass.data.pop(DATA_APIS, {})
+        for api in apis.values():
+            await api.async_close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop_jobs)
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, async_close_apis)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Hello World from a config entry."""
+    started = time.perf_counter()
     # Store an instance of the "connecting" class that does the work of speaking
     # with your actual devices.
     try:
         hass.data.setdefault(DOMAIN, {})[entry.entry_id]
     except:
-        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = token.Token(hass, entry.data["name"], entry.data["token_serial"], entry.data["serial_number"], entry.data["access_token"], entry.data["pin"], entry.data["app"])
+        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = token.Token(hass, entry.data["name"], entry.data["token_serial"], entry.data["serial_number"], entry.data["access_token"], entry.data["pin"], entry.data["app"], dict(entry.options))
+
+    entry_token = hass.data[DOMAIN][entry.entry_id]
+
+    # All entries talking to the same backend share one pooled HTTP session, and the
+    # signs of an entry are spread over all its backends.
+    if entry_token.balancer is None:
+        try:
+            urls = parse_backends(entry.options.get(CONF_BACKENDS) or entry.data.get(CONF_BACKENDS) or API_URL)
+        except ValueError as err:
+            _LOGGER.error("Invalid backends for %s, using %s: %s", entry.title, API_URL, err)
+            urls = [API_URL]
+        for url in urls:
+            api = async_get_api(hass, url)
+            entry_token.backends.append(api)
+            entry_token.lifecycle.async_on_close(partial(async_release_api, hass, api))
+            _async_setup_backend(hass, api)
+        entry_token.balancer = SigningBalancer(entry_token.backends)
+    for api in entry_token.backends:
+        # A backend adapts its concurrency limit below the lowest maximum asked by its entries.
+        api.limiter.set_max_limit(
+            min(
+                loaded.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+                for loaded in hass.data[DOMAIN].values()
+                if api in loaded.backends
+            )
+        )
+        # Entities go unavailable while the circuit breakers of all backends are open.
+        entry.async_on_unload(api.breaker.add_listener(entry_token.async_publish_all))
+
+    # Keep the Google credentials fresh, and store each refreshed token in the entry.
+    @callback
+    def async_persist_credentials() -> None:
+        hass.config_entries.async_update_entry(
+            entry,
+            data={**entry.data, "access_token": json.dumps(entry_token.credentials.token)},
+        )
+
+    entry.async_on_unload(entry_token.credentials.add_listener(async_persist_credentials))
+
+    # The credentials are read, and refreshed if overdue, once Home Assistant has started.
+    @callback
+    def async_start_credentials(_hass: HomeAssistant) -> None:
+        if hass.data[DOMAIN].get(entry.entry_id) is entry_token:
+            entry_token.credentials.async_start(entry_token.balancer)
+
+    async_at_start(hass, async_start_credentials)
+    entry.async_on_unload(entry_token.credentials.async_stop)
+
+    # In asynchronous mode the backend answers at once with a job id and posts the
+    # result to a webhook, so long signs hold no connection open.
+    if entry.options.get(CONF_ASYNC_MODE):
+        if CONF_WEBHOOK_ID not in entry.data:
+            hass.config_entries.async_update_entry(
+                entry, data={**entry.data, CONF_WEBHOOK_ID: webhook.async_generate_id()}
+            )
+        entry.async_on_unload(async_register_webhook(hass, entry.data[CONF_WEBHOOK_ID], entry_token))
+        # Set before the first sign body is built, as it is part of it.
+        entry_token.webhook_url = async_webhook_url(hass, entry.data[CONF_WEBHOOK_ID])
+
+    # Sign jobs of every entry run on one queue, sized for the most demanding entry.
+    entry_token.jobs = await async_get_jobs(hass)
+    entry_token.jobs.async_set_workers(
+        max(loaded.options.get(CONF_WORKERS, DEFAULT_WORKERS) for loaded in hass.data[DOMAIN].values())
+    )
 
     # hass.data.setdefault(DOMAIN, {})[entry.entry_id] = token.Token(hass, entry.data["name"], entry.data["token_serial"], entry.data["serial_number"], entry.data["access_token"], entry.data["pin"], entry.data["app"]) if entry.entry_id not in hass.data.setdefault(DOMAIN, {}).keys() else False
 
     # This creates each HA object for each platform your device requires.
     # It's done by calling the `async_setup_entry` function in each platform module.
     hass.config_entries.async_setup_platforms(entry, PLATFORMS)
+    # Reload the entry when its options are changed, so the new settings are used.
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+    # Sign jobs left unfinished by a restart or a reload are queued again, with their
+    # original idempotency key so the backend does not sign them twice.
+    entry_token.jobs.async_replay(entry_token)
+
+    # Scheduled signs of every entry run from one timer.
+    scheduler = async_get_scheduler(hass)
+    crons_by_serial = {cron.serial_number: cron for cron in entry_token.crons}
+    try:
+        schedules = parse_schedules(entry.options.get(CONF_SCHEDULE, ""), list(crons_by_serial))
+    except (ImportError, ValueError) as err:
+        _LOGGER.error("Ignoring the schedule of %s: %s", entry.title, err)
+        schedules = {}
+    for serial, schedule in schedules.items():
+        scheduler.async_add(crons_by_serial[serial], schedule)
     # hass.async_create_task(
     #     hass.config_entries.async_forward_entry_setup(
     #         ConfigEntry, "cover"
     #     )
     # )
+    _LOGGER.debug(
+        "Set up %s (%s crons) in %.1f ms",
+        entry.title,
+        len(entry_token.crons),
+        (time.perf_counter() - started) * 1000,
+    )
     return True
 
 
+@callback
+def _async_setup_backend(hass: HomeAssistant, api: SigningApi) -> None:
+    """Attach the health poll and the push channel of a backend, once for all entries.
+
+    Both start once Home Assistant has started instead of holding up the setup.
+    """
+    if api.coordinator is not None:
+        return
+    api.coordinator = SigningHealthCoordinator(hass, api)
+    api.push = SignPushChannel(hass, api)
+
+    @callback
+    def async_start_backend(_hass: HomeAssistant) -> None:
+        if not api.users:
+            # Every entry of the backend was unloaded before the start.
+            return
+        hass.async_create_task(api.coordinator.async_refresh())
+        api.push.async_start()
+
+    async_at_start(hass, async_start_backend)
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry after its options changed."""
+    # Also called when a refreshed access token is stored, that needs no reload.
+    if hass.data[DOMAIN][entry.entry_id].options != dict(entry.options):
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # This is called when an entry/configured device is to be removed. The class
@@ -41,6 +215,34 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # details
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_token = hass.data[DOMAIN].pop(entry.entry_id)
+        # Queued jobs stay in the journal and are replayed when the entry is set up again.
+        entry_token.jobs.async_forget(entry_token)
+        if DATA_SCHEDULER in hass.data:
+            hass.data[DATA_SCHEDULER].async_remove_token(entry_token)
+        # Signs in flight get a deadline to finish, then the backend client is released.
+        # Cancelled signs stay in progress in the journal and are replayed.
+        await entry_token.lifecycle.async_close(DEFAULT_DRAIN_TIMEOUT)
+        entry_token.async_stop()
+        if not hass.data[DOMAIN] and DATA_SCHEDULER in hass.data:
+            hass.data.pop(DATA_SCHEDULER).async_stop()
+        if not hass.data[DOMAIN] and DATA_JOBS in hass.data:
+            await hass.data.pop(DATA_JOBS).async_stop()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the unfinished sign jobs of a deleted entry."""
+    token_id = entry.data["name"].replace(" ", "_").lower()
+    cron_ids = {
+        f"{token_id}_{serial}"
+        for serial, _ in token.parse_devices(entry.data["serial_number"], entry.data["app"])
+    }
+    if DATA_JOBS in hass.data:
+        journal = hass.data[DATA_JOBS].journal
+    else:
+        journal = SignJournal(hass)
+        await journal.async_load()
+    journal.async_drop(cron_ids)
+    await journal.async_save()
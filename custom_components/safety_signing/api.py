@@ -0,0 +1,359 @@
+"""Async HTTP client for the SafetySigning backend."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .batch import SignBatcher
+from .const import (
+    DATA_APIS,
+    DEFAULT_AIMD_BACKOFF,
+    DEFAULT_AIMD_TOLERANCE,
+    DEFAULT_BREAKER_RESET_TIMEOUT,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_EARLY_RESULTS,
+    DEFAULT_JOB_TIMEOUT,
+    DEFAULT_KEEPALIVE_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_WAITING,
+    DEFAULT_MIN_CONCURRENCY,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRY_ATTEMPTS,
+    DEFAULT_RETRY_BASE_DELAY,
+    DEFAULT_RETRY_MAX_DELAY,
+)
+from .telemetry import SignTelemetry
+from .util import AdaptiveLimiter, CircuitBreaker, LimitExceeded, backoff_delay
+
+if TYPE_CHECKING:
+    from .coordinator import SigningHealthCoordinator
+    from .push import SignPushChannel
+    from .token import Token
+
+_LOGGER = logging.getLogger(__name__)
+
+# HTTP answers worth trying again, anything else in the 4xx range will not improve.
+RETRYABLE_STATUSES = {408, 425, 429}
+# HTTP answers refusing a request before processing it, safe to send to another backend.
+UNPROCESSED_STATUSES = {429, 503}
+
+
+class SigningApi:
+    """Pooled, keep-alive HTTP session for one signing backend.
+
+    A single instance is shared by every config entry pointing at the same backend,
+    so all crons reuse the same open connections instead of doing a TCP handshake
+    per sign request.
+    """
+
+    def __init__(self, hass: HomeAssistant, base_url: str) -> None:
+        """Init the client and its connection pool."""
+        self._hass = hass
+        self.base_url = base_url.rstrip("/")
+        # Opened by the first request, see the session property.
+        self._session: aiohttp.ClientSession | None = None
+        # Number of config entries currently using this client.
+        self.users = 0
+        # Shared by every Token using the backend, see batch.py.
+        self.batcher = SignBatcher(self)
+        self.breaker = CircuitBreaker(
+            DEFAULT_BREAKER_THRESHOLD, DEFAULT_BREAKER_RESET_TIMEOUT
+        )
+        # Signs in flight on the backend, adapted to its latency below the maximum set
+        # by the entries options.
+        self.limiter = AdaptiveLimiter(
+            DEFAULT_MIN_CONCURRENCY,
+            DEFAULT_MAX_CONCURRENCY,
+            DEFAULT_MAX_WAITING,
+            DEFAULT_AIMD_TOLERANCE,
+            DEFAULT_AIMD_BACKOFF,
+        )
+        # Latency and outcome of every sign sent to the backend.
+        self.telemetry = SignTelemetry()
+        # Token of the entry showing the backend sensor, see sensor.async_setup_entry.
+        self.sensor_owner: Token | None = None
+        # Health polling shared by all entities, attached by __init__.async_setup_entry.
+        self.coordinator: SigningHealthCoordinator | None = None
+        # Sign results pushed by the backend, attached by __init__.async_setup_entry.
+        self.push: SignPushChannel | None = None
+        # Signs accepted by the backend and waiting for their pushed result, by job id.
+        self._jobs: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        # Results pushed before the answer with their job id was read.
+        self._early_results: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    @property
+    def available(self) -> bool:
+        """Return False while the backend is unhealthy or its breaker is open."""
+        if self.coordinator is not None and not self.coordinator.last_update_success:
+            return False
+        return self.breaker.state != CircuitBreaker.STATE_OPEN
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, opening it on first use."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=DEFAULT_POOL_SIZE,
+                    keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
+
+    async def async_sign(
+        self,
+        data: bytes,
+        window: float,
+        connect_timeout: float,
+        read_timeout: float,
+        idempotency_key: str | None = None,
+        attempts: int = DEFAULT_RETRY_ATTEMPTS,
+        failover: bool = False,
+    ) -> dict[str, Any]:
+        """Send an autoSign body, trying transient failures up to attempts times.
+
+        Raises SigningCircuitOpenError without calling the backend while the breaker
+        is open, SigningOverloadedError when too many signs already wait for the
+        backend, and SigningApiError once the attempts are exhausted. With failover,
+        errors showing the request was not processed raise at once, so the caller can
+        send it to another backend. When the backend accepts the sign as a job, waits
+        for the result it pushes.
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise SigningCircuitOpenError(
+                    f"{self.base_url} is failing, not sending sign requests for now"
+                )
+            probe = self.breaker.state == CircuitBreaker.STATE_HALF_OPEN
+            try:
+                async with self.limiter:
+                    started = time.monotonic()
+                    try:
+                        # The batcher tells the breaker how each HTTP request went.
+                        response = await self.batcher.async_sign(
+                            data, window, connect_timeout, read_timeout, idempotency_key
+                        )
+                    except SigningApiError as err:
+                        # Timeouts and 5xx/429 answers mean the backend is struggling.
+                        self.limiter.record(
+                            started, time.monotonic() - started, False, err.retryable
+                        )
+                        raise
+                    # Refusals and job acknowledgements are quicker than a real sign.
+                    self.limiter.record(
+                        started, time.monotonic() - started, is_signed(response)
+                    )
+                if not response:
+                    raise SigningApiError(f"Empty answer from {self.base_url}")
+            except LimitExceeded as err:
+                raise SigningOverloadedError(
+                    f"{self.base_url} is saturated: {self.limiter.active} signs in flight "
+                    f"(limit {self.limiter.limit}) and {self.limiter.waiting} waiting"
+                ) from err
+            except SigningApiError as err:
+                attempt += 1
+                if not err.retryable or attempt >= attempts or (failover and err.unprocessed):
+                    raise
+                delay = backoff_delay(
+                    attempt - 1, DEFAULT_RETRY_BASE_DELAY, DEFAULT_RETRY_MAX_DELAY
+                )
+                _LOGGER.debug("%s, retrying in %.2fs", err, delay)
+            else:
+                break
+            finally:
+                if probe:
+                    # A probe rejected by the limiter or cancelled must not block the next one.
+                    self.breaker.release_probe()
+            await asyncio.sleep(delay)
+        if isinstance(response, dict) and "job_id" in response and "status" not in response:
+            # Accepted, not sent again: the result is pushed once signed.
+            response = await self.async_wait_job(str(response["job_id"]))
+        return response
+
+    def has_job(self, job_id: str) -> bool:
+        """Return True if a sign is waiting for the result of the job."""
+        return job_id in self._jobs
+
+    @property
+    def pending_job_ids(self) -> list[str]:
+        """Return the ids of the jobs waiting for their result."""
+        return list(self._jobs)
+
+    async def async_wait_job(
+        self, job_id: str, timeout: float = DEFAULT_JOB_TIMEOUT
+    ) -> dict[str, Any]:
+        """Wait for the pushed result of an accepted job."""
+        if job_id in self._early_results:
+            return self._early_results.pop(job_id)
+        future = self._jobs[job_id] = self._hass.loop.create_future()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError as err:
+            raise SigningApiTimeoutError(
+                f"No result from {self.base_url} for job {job_id}"
+            ) from err
+        finally:
+            # Delivered results were already removed, timed out jobs are forgotten.
+            if self._jobs.get(job_id) is future:
+                del self._jobs[job_id]
+
+    @callback
+    def async_resolve_job(self, job_id: str, result: dict[str, Any]) -> bool:
+        """Deliver the result of a job, False if no sign was waiting for it yet."""
+        future = self._jobs.pop(job_id, None)
+        if future is None:
+            self._early_results[job_id] = result
+            while len(self._early_results) > DEFAULT_EARLY_RESULTS:
+                self._early_results.popitem(last=False)
+            return False
+        if not future.done():
+            future.set_result(result)
+        return True
+
+    async def async_post(
+        self,
+        path: str,
+        data: bytes | str,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        """POST a JSON body and return the decoded answer."""
+        return await self._async_request(
+            "POST", path, data, connect_timeout, read_timeout, headers
+        )
+
+    async def async_get(
+        self,
+        path: str,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    ) -> Any:
+        """GET a path and return the decoded answer."""
+        return await self._async_request(
+            "GET", path, None, connect_timeout, read_timeout
+        )
+
+    async def _async_request(
+        self,
+        method: str,
+        path: str,
+        data: bytes | str | None,
+        connect_timeout: float,
+        read_timeout: float,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        """Send a request on the pooled session and decode the JSON answer."""
+        timeout = aiohttp.ClientTimeout(
+            total=None, connect=connect_timeout, sock_read=read_timeout
+        )
+        try:
+            async with self.session.request(
+                method, self.base_url + path, data=data, headers=headers, timeout=timeout
+            ) as response:
+                if response.status >= 400:
+                    raise SigningApiResponseError(
+                        f"{self.base_url} answered {response.status} to {path}",
+                        response.status,
+                    )
+                return await response.json(content_type=None)
+        except aiohttp.ClientConnectorError as err:
+            # Nothing was sent, unlike the other errors the request may have been handled.
+            raise SigningApiConnectError(f"Cannot connect to {self.base_url}: {err!r}") from err
+        except asyncio.TimeoutError as err:
+            raise SigningApiTimeoutError(f"Timeout talking to {self.base_url}") from err
+        except (aiohttp.ClientError, ValueError) as err:
+            raise SigningApiError(f"Error talking to {self.base_url}: {err!r}") from err
+
+    async def async_close(self) -> None:
+        """Close the session and every pooled connection."""
+        self.breaker.stop()
+        if self.push is not None:
+            await self.push.async_stop()
+        for future in self._jobs.values():
+            if not future.done():
+                future.set_exception(SigningApiError(f"{self.base_url} client closed"))
+        self._jobs.clear()
+        await self.batcher.async_close(SigningApiError(f"{self.base_url} client closed"))
+        if self._session is not None:
+            await self._session.close()
+
+
+def is_signed(response: Any) -> bool:
+    """Return True if the backend answer reports a successful sign."""
+    return isinstance(response, dict) and response.get("status") == 0
+
+
+def async_get_api(hass: HomeAssistant, base_url: str) -> SigningApi:
+    """Return the shared client for a backend, creating it on first use."""
+    apis = hass.data.setdefault(DATA_APIS, {})
+    if base_url not in apis:
+        apis[base_url] = SigningApi(hass, base_url)
+    api = apis[base_url]
+    api.users += 1
+    return api
+
+
+async def async_release_api(hass: HomeAssistant, api: SigningApi) -> None:
+    """Drop one user of a client, closing it when nobody uses it anymore."""
+    api.users -= 1
+    if api.users <= 0:
+        hass.data.get(DATA_APIS, {}).pop(api.base_url, None)
+        await api.async_close()
+
+
+class SigningApiError(HomeAssistantError):
+    """Error to indicate the signing backend could not be reached."""
+
+    retryable = True
+    # True when the backend provably did not process the request.
+    unprocessed = False
+
+
+class SigningApiConnectError(SigningApiError):
+    """Error to indicate no connection to the signing backend could be opened."""
+
+    unprocessed = True
+
+
+class SigningApiTimeoutError(SigningApiError):
+    """Error to indicate the signing backend did not answer in time."""
+
+    timeout = True
+
+
+class SigningApiResponseError(SigningApiError):
+    """Error to indicate the signing backend answered with an HTTP error."""
+
+    def __init__(self, message: str, status: int) -> None:
+        """Init the error with the HTTP status."""
+        super().__init__(message)
+        self.status = status
+        self.retryable = status >= 500 or status in RETRYABLE_STATUSES
+        self.unprocessed = status in UNPROCESSED_STATUSES
+
+
+class SigningCircuitOpenError(SigningApiError):
+    """Error to indicate the circuit breaker of the backend is open."""
+
+    retryable = False
+    unprocessed = True
+
+
+class SigningOverloadedError(SigningApiError):
+    """Error to indicate too many signs already wait for the backend."""
+
+    retryable = False
+    unprocessed = True
@@ -0,0 +1,143 @@
+"""Google credentials cache, refreshed ahead of expiry."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .api import SigningApiResponseError
+from .const import (
+    DATA_REFRESHES,
+    DEFAULT_REFRESH_MARGIN,
+    DEFAULT_REFRESH_MAX_RETRY,
+    DEFAULT_REFRESH_RETRY,
+)
+from .util import SingleFlight
+
+if TYPE_CHECKING:
+    from .balancer import SigningBalancer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CredentialCache:
+    """In-memory Google credentials of a Token, refreshed before they expire.
+
+    The refresh runs in the background DEFAULT_REFRESH_MARGIN seconds before the
+    access token expires, so sign requests never wait on it. Refreshes are
+    single-flighted per refresh_token, entries sharing credentials refresh them once.
+    The backend owns the OAuth client, so it is asked to do the actual refresh.
+    """
+
+    def __init__(self, hass: HomeAssistant, access_token: str) -> None:
+        """Init the cache from the access token JSON of the config entry."""
+        self._hass = hass
+        # Parsed on first use, entries are set up without decoding their credentials.
+        self._access_token = access_token
+        self._token: dict[str, Any] | None = None
+        self._api: SigningBalancer | None = None
+        self._unsub_refresh: CALLBACK_TYPE | None = None
+        self._listeners: list[Callable[[], None]] = []
+        # Refreshes failed in a row, the retry delay doubles with each of them.
+        self._failures = 0
+
+    @property
+    def token(self) -> dict[str, Any]:
+        """Return the Google credentials."""
+        if self._token is None:
+            self._token = json.loads(self._access_token)
+        return self._token
+
+    @token.setter
+    def token(self, token: dict[str, Any]) -> None:
+        """Replace the Google credentials."""
+        self._token = token
+
+    @property
+    def expires_at(self) -> float:
+        """Return the epoch time the access token expires, 0 if unknown."""
+        return float(self.token.get("expires_at", 0))
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener after each refresh, return a remove function."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @callback
+    def async_start(self, api: SigningBalancer) -> None:
+        """Start refreshing the credentials through the backend."""
+        self._api = api
+        self._async_schedule_refresh(self.expires_at - DEFAULT_REFRESH_MARGIN - time.time())
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the background refresh."""
+        if self._unsub_refresh is not None:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+
+    @callback
+    def _async_schedule_refresh(self, delay: float) -> None:
+        """Plan the next refresh in delay seconds."""
+        self.async_stop()
+        self._unsub_refresh = async_call_later(
+            self._hass, max(0, delay), self._async_refresh_later
+        )
+
+    async def _async_refresh_later(self, _now: Any) -> None:
+        """Refresh from the timer, retrying later on failure."""
+        self._unsub_refresh = None
+        try:
+            await self.async_refresh()
+        except SigningApiResponseError as err:
+            if err.retryable:
+                self._async_retry_refresh(err)
+                return
+            # e.g. 404/405 from a backend without /refreshToken, retrying will not help.
+            _LOGGER.warning(
+                "Could not refresh the Google access token, not trying again: %s", err
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            self._async_retry_refresh(err)
+        else:
+            self._failures = 0
+            self._async_schedule_refresh(
+                self.expires_at - DEFAULT_REFRESH_MARGIN - time.time()
+            )
+
+    @callback
+    def _async_retry_refresh(self, err: Exception) -> None:
+        """Plan another refresh after a failure, backing off exponentially."""
+        delay = min(DEFAULT_REFRESH_RETRY * 2**self._failures, DEFAULT_REFRESH_MAX_RETRY)
+        # Only the first failure of a row is worth a warning.
+        log = _LOGGER.warning if self._failures == 0 else _LOGGER.debug
+        log("Could not refresh the Google access token, trying again in %ss: %s", delay, err)
+        self._failures += 1
+        self._async_schedule_refresh(delay)
+
+    async def async_refresh(self) -> None:
+        """Refresh the credentials now."""
+        flights: SingleFlight = self._hass.data.setdefault(DATA_REFRESHES, SingleFlight())
+        token = await flights.async_run(
+            self.token["refresh_token"], self._async_fetch_token
+        )
+        self.token = token
+        for listener in list(self._listeners):
+            listener()
+
+    async def _async_fetch_token(self) -> dict[str, Any]:
+        """Ask the backend for a new access token."""
+        response = await self._api.async_post(
+            "/refreshToken", json.dumps({"google_token": self.token})
+        )
+        if not isinstance(response, dict) or not response.get("access_token"):
+            raise ValueError(f"Unexpected refresh answer: {response!r}")
+        # Google only returns the refresh token on the first grant, keep ours.
+        token = {**self.token, **response}
+        token["expires_at"] = time.time() + float(response.get("expires_in", 3600))
+        return token
@@ -0,0 +1,131 @@
+"""Spreading of the sign requests of an entry over several backends."""
+from __future__ import annotations
+
+import logging
+import random
+import time
+from typing import Any
+
+from homeassistant.core import callback
+
+from .api import SigningApi, SigningApiError, SigningCircuitOpenError, is_signed
+from .const import DEFAULT_BALANCER_LATENCY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def parse_backends(text: str) -> list[str]:
+    """Split the backends option, URLs separated by ',' or new lines, raise ValueError if invalid."""
+    urls: list[str] = []
+    for url in text.replace("\n", ",").split(","):
+        url = url.strip().rstrip("/")
+        if not url:
+            continue
+        if not url.startswith(("http://", "https://")):
+            raise ValueError(f"Not an http(s) URL: {url}")
+        if url not in urls:
+            urls.append(url)
+    if not urls:
+        raise ValueError("At least one backend URL is needed")
+    return urls
+
+
+class SigningBalancer:
+    """Send the requests of an entry to the best of its backends, failing over.
+
+    Each request goes to the available backend with the lowest (requests in flight
+    + 1) * median latency, so fast and idle servers get more of the load. Backends
+    whose health poll fails or whose breaker is open are skipped until they recover.
+    A request is only tried on the next backend when the failing one provably did not
+    process it: no connection, breaker open, saturated, or a 429/503 answer. After a
+    timeout the first backend may have signed already, so the error is raised.
+    """
+
+    def __init__(self, apis: list[SigningApi]) -> None:
+        """Init the balancer over the shared clients of the backends."""
+        self.apis = apis
+
+    @property
+    def available(self) -> bool:
+        """Return True if any backend can take requests."""
+        return any(api.available for api in self.apis)
+
+    def ranked(self) -> list[SigningApi]:
+        """Return the available backends, best first, then the others."""
+        available = [api for api in self.apis if api.available]
+        # Random tie break, so idle backends of the same speed share the load.
+        ranked = sorted(available, key=lambda api: (_score(api), random.random()))
+        # Nothing looks healthy: trying still beats failing without a request.
+        return ranked or list(self.apis)
+
+    async def async_sign(
+        self,
+        data: bytes,
+        window: float,
+        connect_timeout: float,
+        read_timeout: float,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
+        """Sign on the best backend, failing over to the next ones if it was not processed."""
+        backends = self.ranked()
+        for index, api in enumerate(backends):
+            last = index == len(backends) - 1
+            api.telemetry.sign_started()
+            started = time.monotonic()
+            error: BaseException | str | None = None
+            try:
+                response = await api.async_sign(
+                    data,
+                    window,
+                    connect_timeout,
+                    read_timeout,
+                    idempotency_key,
+                    failover=not last,
+                )
+            except SigningApiError as err:
+                error = err
+                if last or not err.unprocessed:
+                    raise
+                _LOGGER.debug("%s, failing over to %s", err, backends[index + 1].base_url)
+            except BaseException as err:
+                error = err
+                raise
+            else:
+                if not is_signed(response):
+                    error = f"Sign refused: {response!r}"
+                return response
+            finally:
+                api.telemetry.sign_finished(time.monotonic() - started, error)
+        raise SigningCircuitOpenError("No signing backend configured")
+
+    async def async_post(self, path: str, data: bytes | str) -> Any:
+        """POST to the best backend, failing over to the next ones if it was not processed."""
+        backends = self.ranked()
+        for api in backends[:-1]:
+            try:
+                return await api.async_post(path, data)
+            except SigningApiError as err:
+                if not err.unprocessed:
+                    raise
+                _LOGGER.debug("%s, trying the next backend", err)
+        return await backends[-1].async_post(path, data)
+
+    @callback
+    def async_resolve_job(self, job_id: str, result: dict[str, Any]) -> None:
+        """Deliver the result of a job to the backend client waiting for it.
+
+        A result arriving before its job id is offered to every backend, as the one
+        which accepted the job is not known yet.
+        """
+        for api in self.apis:
+            if api.has_job(job_id):
+                api.async_resolve_job(job_id, result)
+                return
+        for api in self.apis:
+            api.async_resolve_job(job_id, result)
+
+
+def _score(api: SigningApi) -> float:
+    """Return the expected wait of a new request on a backend, lower is better."""
+    latency = api.telemetry.latency.percentile(0.5) or DEFAULT_BALANCER_LATENCY
+    return (api.telemetry.in_flight + 1) * latency
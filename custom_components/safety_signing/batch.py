@@ -0,0 +1,227 @@
+"""Merge the sign requests of many crons into one backend round trip."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import json
+import logging
+from typing import TYPE_CHECKING, Any
+
+from .const import DEFAULT_BATCH_MAX_SIZE
+
+if TYPE_CHECKING:
+    from .api import SigningApi
+
+_LOGGER = logging.getLogger(__name__)
+
+# HTTP answers meaning the backend has no batch endpoint.
+UNSUPPORTED_STATUSES = {404, 405, 501}
+
+
+@dataclass
+class PendingSign:
+    """One sign request waiting for its batch to be sent."""
+
+    request_id: str
+    data: bytes
+    future: asyncio.Future
+    connect_timeout: float
+    read_timeout: float
+    idempotency_key: str | None
+
+
+class SignBatcher:
+    """Collect sign requests over a short window and send them as one call.
+
+    There is one batcher per backend, so requests of every Token using the backend
+    end up in the same batch. The batch is sent to /autoSignBatch as
+    {"requests": [{"id": ..., "idempotency_key": ..., "request": <autoSign body>}, ...]}
+    and the backend answers {"results": [{"id": ..., "status": ...}, ...]}. When the
+    backend does not know that endpoint, every request is sent on its own to /autoSign
+    instead, with its idempotency key in the Idempotency-Key header. The breaker of the
+    backend counts each HTTP request once, whatever the number of signs it carries.
+    """
+
+    def __init__(self, api: SigningApi) -> None:
+        """Init an empty batcher for the backend."""
+        self._api = api
+        self._pending: list[PendingSign] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._next_id = 0
+        # Turned off the first time the backend refuses a batch.
+        self.supported = True
+
+    async def async_sign(
+        self,
+        data: bytes,
+        window: float,
+        connect_timeout: float,
+        read_timeout: float,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any] | None:
+        """Sign with the given autoSign body, batched with the other requests."""
+        if window <= 0 or not self.supported:
+            return await self._async_post(
+                "/autoSign", data, connect_timeout, read_timeout, _headers(idempotency_key)
+            )
+
+        loop = asyncio.get_running_loop()
+        self._next_id += 1
+        pending = PendingSign(
+            str(self._next_id),
+            data,
+            loop.create_future(),
+            connect_timeout,
+            read_timeout,
+            idempotency_key,
+        )
+        self._pending.append(pending)
+        if len(self._pending) >= DEFAULT_BATCH_MAX_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(window, self._flush)
+        return await pending.future
+
+    def _flush(self) -> None:
+        """Send everything collected so far."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._async_send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_send(self, batch: list[PendingSign]) -> None:
+        """Send one batch and hand each result to its caller."""
+        try:
+            await self._async_send_batch(batch)
+        finally:
+            # Only left unresolved when the batcher was closed while sending.
+            for item in batch:
+                if not item.future.done():
+                    item.future.cancel()
+
+    async def _async_send_batch(self, batch: list[PendingSign]) -> None:
+        """Post the batch, falling back to single requests if needed."""
+        if len(batch) == 1 or not self.supported:
+            await asyncio.gather(*(self._async_send_single(item) for item in batch))
+            return
+
+        # The bodies are already serialized, they are spliced in as they are.
+        body = b'{"requests":[%s]}' % b",".join(
+            b'{"id":%s,"idempotency_key":%s,"request":%s}'
+            % (
+                json.dumps(item.request_id).encode(),
+                json.dumps(item.idempotency_key).encode(),
+                item.data,
+            )
+            for item in batch
+        )
+        try:
+            response = await self._async_post(
+                "/autoSignBatch",
+                body,
+                max(item.connect_timeout for item in batch),
+                max(item.read_timeout for item in batch),
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            # api.py imports this module, so the HTTP error is recognised by its status.
+            if getattr(err, "status", None) not in UNSUPPORTED_STATUSES:
+                for item in batch:
+                    _resolve(item, exception=err)
+                return
+            response = None
+
+        if not isinstance(response, dict) or not isinstance(response.get("results"), list):
+            _LOGGER.info(
+                "%s does not support batched signing, sending requests one by one",
+                self._api.base_url,
+            )
+            self.supported = False
+            await asyncio.gather(*(self._async_send_single(item) for item in batch))
+            return
+
+        results = {
+            str(result.get("id")): result
+            for result in response["results"]
+            if isinstance(result, dict)
+        }
+        for item in batch:
+            _resolve(item, result=results.get(item.request_id))
+
+    async def _async_send_single(self, item: PendingSign) -> None:
+        """Send a request on its own."""
+        try:
+            result = await self._async_post(
+                "/autoSign",
+                item.data,
+                item.connect_timeout,
+                item.read_timeout,
+                _headers(item.idempotency_key),
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _resolve(item, exception=err)
+        else:
+            _resolve(item, result=result)
+
+    async def _async_post(
+        self,
+        path: str,
+        data: bytes,
+        connect_timeout: float,
+        read_timeout: float,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        """POST to the backend, telling its breaker how the request went."""
+        breaker = self._api.breaker
+        try:
+            response = await self._api.async_post(
+                path, data, connect_timeout, read_timeout, headers
+            )
+        except Exception as err:
+            if getattr(err, "retryable", True):
+                breaker.record_failure()
+            else:
+                # The backend is reachable, it just refused this request.
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return response
+
+    async def async_close(self, err: Exception) -> None:
+        """Fail the requests that were not sent yet and stop the running batches."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        for item in batch:
+            _resolve(item, exception=err)
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _headers(idempotency_key: str | None) -> dict[str, str] | None:
+    """Return the extra headers of a single sign request."""
+    if idempotency_key is None:
+        return None
+    return {"Idempotency-Key": idempotency_key}
+
+
+def _resolve(
+    item: PendingSign,
+    result: dict[str, Any] | None = None,
+    exception: Exception | None = None,
+) -> None:
+    """Complete the future of a pending request if nobody did it yet."""
+    if item.future.done():
+        return
+    if exception is not None:
+        item.future.set_exception(exception)
+    else:
+        item.future.set_result(result)
@@ -8,10 +8,31 @@ import voluptuous as vol
 from voluptuous import Schema, Required
 
 from homeassistant import config_entries, exceptions
-from homeassistant.core import HomeAssistant
-
-from .const import DOMAIN  # pylint:disable=unused-import
-from .token import Token
+from homeassistant.core import HomeAssistant, callback
+
+from .balancer import parse_backends
+from .const import (  # pylint:disable=unused-import
+    API_URL,
+    CONF_ASYNC_MODE,
+    CONF_BACKENDS,
+    CONF_BATCH_WINDOW,
+    CONF_CONNECT_TIMEOUT,
+    CONF_MAX_CONCURRENCY,
+    CONF_PER_APP,
+    CONF_READ_TIMEOUT,
+    CONF_SCHEDULE,
+    CONF_SPREAD_WINDOW,
+    CONF_WORKERS,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_SPREAD_WINDOW,
+    DEFAULT_WORKERS,
+    DOMAIN,
+)
+from .scheduler import parse_schedules
+from .token import parse_devices
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,7 +53,8 @@ DATA_SCHEMA = Schema({
     Required("serial_number"): str,
     Required("pin"): str,
     Required("access_token"): str,
-    Required("app"): str
+    Required("app"): str,
+    vol.Optional(CONF_BACKENDS, default=API_URL): str,
 })
 
 
@@ -49,7 +71,14 @@ async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
     if len(data["name"]) < 3:
         raise InvalidName
     
-    if len(data["token_serial"]) < 5 or len(data["serial_number"]) < 5:
+    # One entry can drive several devices, see token.parse_devices.
+    try:
+        devices = parse_devices(data["serial_number"], data["app"])
+    except ValueError:
+        raise InvalidApp
+
+    serials = [serial for serial, _ in devices]
+    if len(data["token_serial"]) < 5 or any(len(serial) < 5 for serial in serials) or len(set(serials)) != len(serials):
         raise InvalidSerialNumber
     
     if len(data["token_serial"]) < 5:
@@ -65,16 +94,20 @@ async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
     except:
         raise InvalidAccessToken
 
-    if len(data["app"]) > 1:
-        app_list = data["app"].split(';')
-        for app in app_list:
-            if app not in ["XHDO", "BHXH", "THUE", "KHAC"]:
-                raise InvalidApp
+    try:
+        parse_backends(data.get(CONF_BACKENDS, API_URL))
+    except ValueError:
+        raise InvalidBackends
 
+    for _, device_app in devices:
+        if len(device_app) > 1:
+            app_list = device_app.split(';')
+            for app in app_list:
+                if app not in ["XHDO", "BHXH", "THUE", "KHAC"]:
+                    raise InvalidApp
 
-    token = Token(hass, data["name"], data["token_serial"], data["serial_number"], data["access_token"], data["pin"], data["app"])
     # The dummy token provides a `test_connection` method to ensure it's working
-    # as expected
+    # as expected. Nothing is built here, the Token is created when the entry is set up.
 
     # result = await token.test_connection()
     # if not result:
@@ -123,6 +156,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["serial_number"] = "invalid_serial_number"
             except InvalidPin:
                 errors["pin"] = "invalid_pin"
+            except InvalidBackends:
+                errors[CONF_BACKENDS] = "invalid_backends"
             except InvalidAccessToken:
                 errors["access_token"] = "invalid_access_token"
             except InvalidApp:
@@ -136,6 +171,54 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=DATA_SCHEMA, errors=errors
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options (tuning of the backend connection) of an entry."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        errors = {}
+        if user_input is not None:
+            serials = [serial for serial, _ in parse_devices(self.config_entry.data["serial_number"], self.config_entry.data["app"])]
+            try:
+                parse_schedules(user_input.get(CONF_SCHEDULE, ""), serials)
+            except (ImportError, ValueError):
+                errors[CONF_SCHEDULE] = "invalid_schedule"
+            try:
+                parse_backends(user_input[CONF_BACKENDS])
+            except ValueError:
+                errors[CONF_BACKENDS] = "invalid_backends"
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = user_input or self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=Schema({
+                Required(CONF_BACKENDS, default=options.get(CONF_BACKENDS) or self.config_entry.data.get(CONF_BACKENDS, API_URL)): str,
+                Required(CONF_CONNECT_TIMEOUT, default=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT)): vol.All(vol.Coerce(float), vol.Range(min=1, max=60)),
+                Required(CONF_READ_TIMEOUT, default=options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT)): vol.All(vol.Coerce(float), vol.Range(min=1, max=300)),
+                Required(CONF_BATCH_WINDOW, default=options.get(CONF_BATCH_WINDOW, DEFAULT_BATCH_WINDOW)): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+                Required(CONF_WORKERS, default=options.get(CONF_WORKERS, DEFAULT_WORKERS)): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                vol.Optional(CONF_SCHEDULE, default=options.get(CONF_SCHEDULE, "")): str,
+                Required(CONF_SPREAD_WINDOW, default=options.get(CONF_SPREAD_WINDOW, DEFAULT_SPREAD_WINDOW)): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                Required(CONF_PER_APP, default=options.get(CONF_PER_APP, False)): bool,
+                Required(CONF_ASYNC_MODE, default=options.get(CONF_ASYNC_MODE, False)): bool,
+                Required(CONF_MAX_CONCURRENCY, default=options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)): vol.All(vol.Coerce(int), vol.Range(min=1, max=256)),
+            }),
+            errors=errors,
+        )
+
 
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -157,4 +240,7 @@ class InvalidAccessToken(exceptions.HomeAssistantError):
     """Error to indicate there is an invalid accessToken."""
 
 class InvalidApp(exceptions.HomeAssistantError):
-    """Error to indicate there is an invalid app."""
\ No newline at end of file
+    """Error to indicate there is an invalid app."""
+
+class InvalidBackends(exceptions.HomeAssistantError):
+    """Error to indicate there is an invalid backend URL."""
\ No newline at end of file
@@ -3,4 +3,121 @@
 # This is the internal name of the integration, it should also match the directory
 # name for the integration.
 DOMAIN = "safety_signing"
-API_URL = "http://192.168.11.66:3000/api"
\ No newline at end of file
+# Backend of the entries created before the backends could be configured.
+API_URL = "http://192.168.11.66:3000/api"
+
+# hass.data key holding the HTTP clients shared by every entry using the same backend.
+DATA_APIS = f"{DOMAIN}_apis"
+# hass.data key holding the sign job queue of the integration.
+DATA_JOBS = f"{DOMAIN}_jobs"
+# hass.data key holding the Google token refreshes in flight, keyed by refresh_token.
+DATA_REFRESHES = f"{DOMAIN}_refreshes"
+# hass.data key holding the scheduler of the integration.
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+
+# Signing backends of an entry, URLs separated by ','. Set when the entry is created,
+# and overridden by the option of the same name.
+CONF_BACKENDS = "backends"
+
+# Options that can be changed after the entry has been created (see the options flow).
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_BATCH_WINDOW = "batch_window"
+CONF_WORKERS = "workers"
+CONF_SCHEDULE = "schedule"
+CONF_SPREAD_WINDOW = "spread_window"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_PER_APP = "per_app"
+CONF_ASYNC_MODE = "async_mode"
+
+# Seconds allowed to open a connection to the backend and to wait for its answer.
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+# Connection pool of each backend session. Idle connections are kept open for reuse.
+DEFAULT_POOL_SIZE = 20
+DEFAULT_KEEPALIVE_TIMEOUT = 60
+# Transient failures are retried with capped, jittered exponential backoff.
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 8
+# Median sign latency, in seconds, assumed for a backend that has not signed yet when
+# choosing where to send a request.
+DEFAULT_BALANCER_LATENCY = 0.1
+# Consecutive failures opening the circuit breaker of a backend, and seconds it
+# stays open before a probe request is let through.
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_TIMEOUT = 30
+# Bounds, in seconds, of the adaptive health polling interval of a backend.
+DEFAULT_HEALTH_MIN_INTERVAL = 15
+DEFAULT_HEALTH_MAX_INTERVAL = 300
+# Google access tokens are refreshed this many seconds before they expire, a failed
+# refresh is tried again after DEFAULT_REFRESH_RETRY seconds, doubling after each
+# failure up to DEFAULT_REFRESH_MAX_RETRY.
+DEFAULT_REFRESH_MARGIN = 300
+DEFAULT_REFRESH_RETRY = 60
+DEFAULT_REFRESH_MAX_RETRY = 3600
+
+# Long signs are answered with a job id, their result is pushed on a WebSocket opened
+# on PUSH_PATH. Signs wait at most DEFAULT_JOB_TIMEOUT seconds for it. The connection is
+# pinged every DEFAULT_PUSH_HEARTBEAT seconds and reopened with capped backoff.
+PUSH_PATH = "/events"
+DEFAULT_JOB_TIMEOUT = 600
+DEFAULT_PUSH_HEARTBEAT = 30
+DEFAULT_PUSH_BASE_DELAY = 1
+DEFAULT_PUSH_MAX_DELAY = 60
+# In asynchronous mode the sign results are posted to a webhook, whose id is stored in
+# the entry data under this key.
+CONF_WEBHOOK_ID = "webhook_id"
+# Results pushed before the answer carrying their job id are kept, up to this many.
+DEFAULT_EARLY_RESULTS = 1000
+
+# Sign requests arriving within this many seconds are sent to the backend in one call.
+DEFAULT_BATCH_WINDOW = 0.05
+DEFAULT_BATCH_MAX_SIZE = 50
+
+# Sign jobs run in the background by this many workers. Lower priorities run first.
+DEFAULT_WORKERS = 4
+PRIORITY_MANUAL = 0
+PRIORITY_SCHEDULED = 10
+# Automated signs start spread over this many seconds (0 to start them at once): at a
+# fixed offset hashed from the cron id, plus up to DEFAULT_SPREAD_JITTER random seconds.
+DEFAULT_SPREAD_WINDOW = 0
+DEFAULT_SPREAD_JITTER = 2
+# With the per_app option, the apps of a cron are signed with one request each, this
+# many at a time.
+DEFAULT_APP_PARALLELISM = 2
+# Most signs in flight at once on a backend, whatever the number of entries and workers.
+DEFAULT_MAX_CONCURRENCY = DEFAULT_POOL_SIZE
+# Within that maximum, the limit adapts to the backend: it is multiplied by
+# DEFAULT_AIMD_BACKOFF on timeouts, overload answers, or signs slower than
+# DEFAULT_AIMD_TOLERANCE times the usual latency, and grows back by one sign at a
+# time, down to DEFAULT_MIN_CONCURRENCY. Up to DEFAULT_MAX_WAITING signs wait for a
+# free slot, the next ones fail at once.
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_AIMD_TOLERANCE = 2.0
+DEFAULT_AIMD_BACKOFF = 0.5
+DEFAULT_MAX_WAITING = 100
+# Sign jobs are journaled to disk at most every JOURNAL_SAVE_DELAY seconds.
+JOURNAL_SAVE_DELAY = 5
+# Seconds the sign jobs in flight are given to finish when an entry is unloaded,
+# those still running are then cancelled and replayed on the next setup.
+DEFAULT_DRAIN_TIMEOUT = 10
+# Longest sleep of the scheduler timer, so wall clock changes are caught up.
+SCHEDULER_MAX_SLEEP = 3600
+
+# Answers of the backend are reused for DEFAULT_RESULT_TTL seconds when the same cron
+# signs the same body again, e.g. automations retrying. At most this many are kept.
+DEFAULT_RESULT_TTL = 30
+DEFAULT_RESULT_CACHE_SIZE = 256
+
+# Service signing with many crons at once, with this many signs in flight by default.
+# Its results are also fired as an EVENT_SIGN_MANY_RESULT event.
+SERVICE_SIGN_MANY = "sign_many"
+EVENT_SIGN_MANY_RESULT = f"{DOMAIN}_sign_many_result"
+DEFAULT_SIGN_MANY_CONCURRENCY = 10
+
+# Seconds cron updates are gathered before the entities are told, 0 for one loop tick.
+STATE_WRITE_DEBOUNCE = 0
+
+# Seconds covered by each of the two windows of the sign latency histograms.
+TELEMETRY_WINDOW = 300
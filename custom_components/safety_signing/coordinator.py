@@ -0,0 +1,57 @@
+"""Shared health polling of a signing backend."""
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .api import SigningApi, SigningApiError, SigningApiResponseError
+from .const import DEFAULT_HEALTH_MAX_INTERVAL, DEFAULT_HEALTH_MIN_INTERVAL, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SigningHealthCoordinator(DataUpdateCoordinator):
+    """Poll the health endpoint of one backend for every entity using it.
+
+    The interval doubles after each healthy answer, up to DEFAULT_HEALTH_MAX_INTERVAL,
+    and drops back to DEFAULT_HEALTH_MIN_INTERVAL as soon as a poll fails so a
+    recovering backend is noticed quickly. Only answers showing the backend down or
+    struggling (no connection, timeout, 5xx, 429) make it unhealthy. A backend without
+    a health endpoint is left to its circuit breaker.
+    """
+
+    def __init__(self, hass: HomeAssistant, api: SigningApi) -> None:
+        """Init the coordinator for the backend."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {api.base_url}",
+            update_interval=timedelta(seconds=DEFAULT_HEALTH_MIN_INTERVAL),
+        )
+        self.api = api
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        """Fetch the backend health."""
+        try:
+            data = await self.api.async_get("/health")
+        except SigningApiResponseError as err:
+            if err.status >= 500 or err.status == 429:
+                self.update_interval = timedelta(seconds=DEFAULT_HEALTH_MIN_INTERVAL)
+                raise UpdateFailed(str(err)) from err
+            # Up, but without a usable health endpoint (404, 405, ...).
+            self.update_interval = timedelta(seconds=DEFAULT_HEALTH_MAX_INTERVAL)
+            return {}
+        except SigningApiError as err:
+            self.update_interval = timedelta(seconds=DEFAULT_HEALTH_MIN_INTERVAL)
+            raise UpdateFailed(str(err)) from err
+
+        self.update_interval = min(
+            self.update_interval * 2, timedelta(seconds=DEFAULT_HEALTH_MAX_INTERVAL)
+        )
+        # The backend answers again, no need to wait for the breaker timeout.
+        self.api.breaker.record_success()
+        return data if isinstance(data, dict) else {}
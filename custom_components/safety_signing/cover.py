@@ -18,6 +18,7 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from .const import DOMAIN
+from .entity import CronEntity
 
 
 # This function is called as part of the __init__.async_setup_entry (via the
@@ -28,52 +29,34 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     # __init__.async_setup_entry function
     token = hass.data[DOMAIN][config_entry.entry_id]
 
-    new_devices = []
-    for cron in token.crons:
-        new_devices.append(HelloWorldCover(hass, cron))
+    # Every device of the token is added in a single call, even for large entries.
+    new_devices = [HelloWorldCover(hass, cron) for cron in token.crons]
     if new_devices:
         async_add_entities(new_devices)
 
 
-# This entire class could be written to extend a base class to ensure common attributes
-# are kept identical/in sync. It's broken apart here between the Cover and Sensors to
-# be explicit about what is returned, and the comments outline where the overlap is.
-class HelloWorldCover(LightEntity):
+# The common attributes of the cover and the sensors (device_info, availability and the
+# change-only state writes) come from the CronEntity base class in entity.py.
+class HelloWorldCover(CronEntity, LightEntity):
     """Representation of a dummy Cover."""
 
     def __init__(self, hass, cron) -> None:
         """Initialize the sensor."""
         # Usual setup is done here. Callbacks are added in async_added_to_hass.
+        super().__init__(cron)
         self._hass = hass
-        self._cron = cron
         self._attr_unique_id = f"{self._cron.cron_id}_button"
         self._attr_name = f"{self._cron.name}_button"
         self.is_light_on = False
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Information about this entity/device."""
-        return {
-            "identifiers": {(DOMAIN, self._cron.cron_id)},
-            # If desired, the name for the device could be different to the entity
-            "name": self.name,
-            "sw_version": self._cron.firmware_version,
-            "model": self._cron.model,
-            "manufacturer": self._cron.token.manufacturer,
-        }
-
-    @property
-    def available(self) -> bool:
-        """Return True if cron and token is available."""
-        return self._cron.online and self._cron.token.online
-
     async def async_added_to_hass(self) -> None:
         """Run when this Entity has been added to HA."""
-        self._cron.register_callback(self.async_write_ha_state)
+        await super().async_added_to_hass()
+        self._cron.register_callback(self.async_write_if_changed)
 
     async def async_will_remove_from_hass(self) -> None:
         """Entity being removed from hass."""
-        self._cron.remove_callback(self.async_write_ha_state)
+        self._cron.remove_callback(self.async_write_if_changed)
     
     @property
     def is_on(self) -> bool:
@@ -88,8 +71,12 @@ class HelloWorldCover(LightEntity):
         """Turn device on."""
         self.is_light_on = True
         if self._cron.is_enable == "on":
-            await self._cron.running_cron()
+            # Signing runs in the background, the state is pushed when it is done.
+            # Presses from a user start at once, automations get spread out.
+            self._cron.queue_sign(spread=self._context is None or self._context.user_id is None)
+        self.async_write_if_changed()
 
     async def async_turn_off(self, **kwargs):
         self.is_light_on = False
         """Do nothing"""
+        self.async_write_if_changed()
@@ -155,16 +155,15 @@ class HelloWorldCover(CoverEntity):
     # the cover to the desired position, or open and close it all the way.
     async def async_open_cover(self, **kwargs: Any) -> None:
         """Open the cover."""
-        await self._cron.running_cron()
+        self._cron.queue_sign()
         await self._cron.set_position(100)
 
     async def async_close_cover(self, **kwargs: Any) -> None:
         """Close the cover."""
-        
-        await self._cron.running_cron()
+        self._cron.queue_sign()
         await self._cron.set_position(0)
 
     async def async_set_cover_position(self, **kwargs: Any) -> None:
         """Close the cover."""
-        await self._cron.running_cron()
+        self._cron.queue_sign()
         await self._cron.set_position(kwargs[ATTR_POSITION])
\ No newline at end of file
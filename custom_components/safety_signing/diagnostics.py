@@ -0,0 +1,75 @@
+"""Diagnostics support for SafetySigning."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_SPREAD_WINDOW, DATA_SCHEDULER, DEFAULT_SPREAD_WINDOW, DOMAIN
+
+TO_REDACT = {"access_token", "pin", "webhook_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    token = hass.data[DOMAIN][entry.entry_id]
+    scheduler = hass.data.get(DATA_SCHEDULER)
+    delays = [cron.dispatch_delay for cron in token.crons]
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "backends": [
+            {
+                "url": api.base_url,
+                "available": api.available,
+                "breaker": api.breaker.state,
+                "batching": api.batcher.supported,
+                "health_interval": api.coordinator.update_interval.total_seconds(),
+                "in_flight": api.telemetry.in_flight,
+                "push": {
+                    "connected": api.push.connected,
+                    "reconnects": api.push.reconnects,
+                    "pending_jobs": len(api.pending_job_ids),
+                },
+                "concurrency": {
+                    "limit": api.limiter.limit,
+                    "max_limit": api.limiter.max_limit,
+                    "active": api.limiter.active,
+                    "peak": api.limiter.peak,
+                    "waiting": api.limiter.waiting,
+                    "rejections": api.limiter.rejections,
+                    "baseline_latency": api.limiter.baseline,
+                },
+            }
+            for api in token.backends
+        ],
+        "jobs": {**token.jobs.metrics, "entry_in_flight": token.lifecycle.in_flight},
+        "async_mode": token.webhook_url is not None,
+        "result_cache": {
+            "size": len(token.results),
+            "hits": token.results.hits,
+            "misses": token.results.misses,
+        },
+        "spread": {
+            "window": token.options.get(CONF_SPREAD_WINDOW, DEFAULT_SPREAD_WINDOW),
+            # Gap between the first and the last start of the last queued signs.
+            "effective": max(delays) - min(delays) if delays else 0,
+        },
+        "crons": {
+            cron.cron_id: {
+                "enable": cron.is_enable,
+                "state_writes": dict(cron.state_writes),
+                "dispatch_delay": cron.dispatch_delay,
+                "apps": dict(cron.app_status),
+                "next_scheduled_sign": scheduler.next_due(cron.cron_id) if scheduler else None,
+            }
+            for cron in token.crons
+        },
+    }
@@ -0,0 +1,72 @@
+"""Base entity shared by the platforms of a cron."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from .const import DOMAIN
+
+
+class CronEntity(Entity):
+    """Base representation of an entity attached to a cron.
+
+    State updates go through async_write_if_changed, which skips the write when
+    nothing the entity exposes changed since the last one. This keeps bursts of cron
+    updates and health polls from flooding the state machine and the recorder.
+    """
+
+    should_poll = False
+
+    def __init__(self, cron) -> None:
+        """Initialize the entity."""
+        self._cron = cron
+        self._written_state: tuple[Any, ...] | None = None
+
+    # To link the entities to the same device, this property must return the same
+    # identifiers value for each of them.
+    @property
+    def device_info(self):
+        """Return information to link this entity with the correct device."""
+        return {
+            "identifiers": {(DOMAIN, self._cron.cron_id)},
+            # If desired, the name for the device could be different to the entity
+            "name": self.name,
+            "sw_version": self._cron.firmware_version,
+            "model": self._cron.model,
+            "manufacturer": self._cron.token.manufacturer,
+        }
+
+    @property
+    def available(self) -> bool:
+        """Return True if cron and token is available."""
+        return self._cron.online and self._cron.token.online
+
+    async def async_added_to_hass(self) -> None:
+        """Run when this Entity has been added to HA."""
+        # HA writes the initial state right after this, remember what it will contain.
+        self._written_state = self._state_snapshot()
+        # Lets the services find the cron of a targeted entity.
+        self._cron.entity_ids.add(self.entity_id)
+        self.async_on_remove(lambda: self._cron.entity_ids.discard(self.entity_id))
+        # Availability comes from the health polls shared by every entity of the backends.
+        for api in self._cron.token.backends:
+            self.async_on_remove(
+                api.coordinator.async_add_listener(self.async_write_if_changed)
+            )
+
+    def _state_snapshot(self) -> tuple[Any, ...]:
+        """Return everything this entity exposes to the state machine."""
+        return (self.available, self.state, self.icon, self.extra_state_attributes)
+
+    @callback
+    def async_write_if_changed(self) -> None:
+        """Write the state to HA, unless it is the same as the last one written."""
+        snapshot = self._state_snapshot()
+        if snapshot == self._written_state:
+            self._cron.state_writes["suppressed"] += 1
+            return
+        self._written_state = snapshot
+        self._cron.state_writes["emitted"] += 1
+        self.async_write_ha_state()
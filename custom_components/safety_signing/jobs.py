@@ -0,0 +1,224 @@
+"""Background queue running the sign jobs of every cron."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .api import SigningApiError
+from .const import DATA_JOBS, DEFAULT_WORKERS, PRIORITY_MANUAL
+from .journal import (
+    STATE_DONE,
+    STATE_DROPPED,
+    STATE_FAILED,
+    STATE_IN_PROGRESS,
+    STATE_PENDING,
+    SignJournal,
+)
+
+if TYPE_CHECKING:
+    from .token import Crons, Token
+
+_LOGGER = logging.getLogger(__name__)
+
+# Priority of the items retiring a worker, ahead of every job so idle workers go first.
+RETIRE_PRIORITY = -1
+
+
+class SignJobQueue:
+    """Priority queue of sign jobs drained by a bounded pool of workers.
+
+    Entities only enqueue a job and return, a worker later runs the sign and pushes
+    the new state through Crons.publish_updates. Lower priorities run first, so
+    manual presses overtake scheduled runs.
+    """
+
+    def __init__(self, hass: HomeAssistant, journal: SignJournal) -> None:
+        """Init an empty queue without workers."""
+        self._hass = hass
+        self.journal = journal
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._workers: list[asyncio.Task] = []
+        # Workers asked to stop once they are idle, see async_set_workers.
+        self._retiring = 0
+        self._counter = itertools.count()
+        # cron_id -> (priority, idempotency key, cron) of the job waiting for that cron.
+        # The cron is compared too: after a reload the queue may still hold items of the
+        # previous Crons object with the same id and key.
+        self._queued: dict[str, tuple[int, str, Crons]] = {}
+        # Idempotency key -> timer of the jobs waiting for their spread-out start.
+        self._delayed: dict[str, asyncio.TimerHandle] = {}
+        # Idempotency keys of the jobs being signed right now.
+        self._running_keys: set[str] = set()
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        """Return queue depth and job counters."""
+        return {
+            "workers": len(self._workers) - self._retiring,
+            "depth": self._queue.qsize() - self._retiring,
+            "delayed": len(self._delayed),
+            "max_depth": self.max_depth,
+            "running": self.running,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    def async_set_workers(self, count: int) -> None:
+        """Grow or shrink the worker pool to count workers.
+
+        Workers in excess are retired by the next idle ones, a busy worker finishes
+        its job first.
+        """
+        count = max(1, count)
+        workers = len(self._workers) - self._retiring
+        while workers < count:
+            self._workers.append(self._hass.loop.create_task(self._async_worker()))
+            workers += 1
+        while workers > count:
+            self._retiring += 1
+            self._queue.put_nowait((RETIRE_PRIORITY, next(self._counter), None, None))
+            workers -= 1
+
+    def async_enqueue(
+        self,
+        cron: Crons,
+        priority: int = PRIORITY_MANUAL,
+        key: str | None = None,
+        delay: float = 0,
+    ) -> bool:
+        """Queue a sign job for cron, False if one is already waiting for it.
+
+        Each job gets the idempotency key of its body, recorded in the journal and
+        sent to the backend. Replayed jobs pass their original key. A job with a delay is
+        journaled at once but only reaches the workers `delay` seconds later.
+        """
+        queued = self._queued.get(cron.cron_id)
+        if queued is not None and queued[0] <= priority:
+            return False
+        if queued is not None:
+            # A more urgent request replaces the waiting one, the stale entry is
+            # skipped when a worker pops it.
+            self.journal.async_append(queued[1], cron.cron_id, STATE_DROPPED, queued[0])
+            self._cancel_delayed(queued[1])
+        key = key or cron.idempotency_key()
+        self._queued[cron.cron_id] = (priority, key, cron)
+        self.journal.async_append(key, cron.cron_id, STATE_PENDING, priority)
+        if delay > 0:
+            self._delayed[key] = self._hass.loop.call_later(
+                delay, self._put, priority, key, cron
+            )
+        else:
+            self._put(priority, key, cron)
+        return True
+
+    def _put(self, priority: int, key: str, cron: Crons) -> None:
+        """Hand a job over to the workers."""
+        self._delayed.pop(key, None)
+        self._queue.put_nowait((priority, next(self._counter), key, cron))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _cancel_delayed(self, key: str) -> None:
+        """Cancel the start timer of a job, if it is still waiting for it."""
+        handle = self._delayed.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+
+    @callback
+    def async_replay(self, token: Token) -> int:
+        """Queue again the unfinished journal jobs of the crons of token."""
+        replayed = 0
+        for key, cron_id, priority in self.journal.unfinished():
+            cron = token.get_cron(cron_id)
+            if cron is None or key in self._running_keys:
+                continue
+            if self.async_enqueue(cron, priority, key):
+                replayed += 1
+        if replayed:
+            _LOGGER.info("Replaying %s unfinished sign jobs of %s", replayed, token.token_id)
+        return replayed
+
+    @callback
+    def async_forget(self, token: Token) -> None:
+        """Drop the queued jobs of token, they stay in the journal for the next setup."""
+        for cron in token.crons:
+            queued = self._queued.get(cron.cron_id)
+            if queued is not None and queued[2] is cron:
+                del self._queued[cron.cron_id]
+                self._cancel_delayed(queued[1])
+
+    async def _async_worker(self) -> None:
+        """Run queued jobs until cancelled."""
+        while True:
+            priority, _, key, cron = await self._queue.get()
+            try:
+                if cron is None:
+                    self._retiring -= 1
+                    self._workers.remove(asyncio.current_task())
+                    return
+                queued = self._queued.get(cron.cron_id)
+                if queued is None or queued[:2] != (priority, key) or queued[2] is not cron:
+                    # Replaced by a more urgent job, or left over by an unloaded entry.
+                    continue
+                del self._queued[cron.cron_id]
+                self.journal.async_append(key, cron.cron_id, STATE_IN_PROGRESS, priority)
+                self.running += 1
+                self._running_keys.add(key)
+                state = STATE_FAILED
+                # The sign is a task of the entry of the cron, so unloading the entry
+                # drains or cancels it, and stopping the workers does not.
+                sign = cron.start_sign(key)
+                try:
+                    await asyncio.wait((sign,))
+                    if sign.cancelled():
+                        # Cancelled by the unload of the entry, the job stays in
+                        # progress and is replayed with the same key on the next setup.
+                        continue
+                    sign.result()
+                    state = STATE_DONE
+                except SigningApiError as err:
+                    self.failed += 1
+                    _LOGGER.warning("Sign job of %s failed: %s", cron.cron_id, err)
+                except Exception:  # pylint: disable=broad-except
+                    self.failed += 1
+                    _LOGGER.exception("Sign job of %s failed", cron.cron_id)
+                finally:
+                    self.running -= 1
+                    self._running_keys.discard(key)
+                    self.processed += 1
+                # Not reached when the worker is cancelled mid-sign, the job is then
+                # left to the entry and stays in progress in the journal.
+                self.journal.async_append(key, cron.cron_id, state, priority)
+                await cron.publish_updates()
+            finally:
+                self._queue.task_done()
+
+    async def async_stop(self) -> None:
+        """Stop the workers, the jobs still queued stay in the journal."""
+        for handle in self._delayed.values():
+            handle.cancel()
+        self._delayed.clear()
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await self.journal.async_save()
+
+
+async def async_get_jobs(hass: HomeAssistant) -> SignJobQueue:
+    """Return the integration job queue, creating it and loading its journal on first use."""
+    if DATA_JOBS not in hass.data:
+        journal = SignJournal(hass)
+        await journal.async_load()
+        # Another entry may have created the queue while the journal was loading.
+        if DATA_JOBS not in hass.data:
+            hass.data[DATA_JOBS] = SignJobQueue(hass, journal)
+            hass.data[DATA_JOBS].async_set_workers(DEFAULT_WORKERS)
+    return hass.data[DATA_JOBS]
@@ -0,0 +1,92 @@
+"""Persistent journal of the sign jobs, surviving restarts and reloads."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, JOURNAL_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.journal"
+
+STATE_PENDING = "pending"
+STATE_IN_PROGRESS = "in_progress"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_DROPPED = "dropped"
+
+# Jobs in these states were not finished and are replayed on setup.
+UNFINISHED_STATES = (STATE_PENDING, STATE_IN_PROGRESS)
+
+
+class SignJournal:
+    """Append-only journal of the sign jobs, stored with the HA storage helper.
+
+    Every state change of a job is appended as a record keyed by the job idempotency
+    key. Writes are delayed by JOURNAL_SAVE_DELAY seconds so a burst of jobs costs
+    one disk write, and the records are compacted to the last state of each job when
+    saved. A job is forgotten once finished, so the file only holds the jobs to replay.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Init an empty journal."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # Records appended since the last compaction.
+        self._records: list[dict[str, Any]] = []
+        # Last record of each job, by idempotency key.
+        self._jobs: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the journal from disk."""
+        data = await self._store.async_load() or {}
+        self._records = list(data.get("records", []))
+        self._compact()
+
+    @callback
+    def async_append(self, key: str, cron_id: str, state: str, priority: int) -> None:
+        """Record a new state of a job and schedule a write."""
+        self._records.append(
+            {"key": key, "cron_id": cron_id, "state": state, "priority": priority, "at": time.time()}
+        )
+        self._store.async_delay_save(self._data_to_save, JOURNAL_SAVE_DELAY)
+
+    def unfinished(self) -> list[tuple[str, str, int]]:
+        """Return (key, cron_id, priority) of the jobs that were never finished."""
+        self._compact()
+        return [
+            (key, record["cron_id"], record["priority"])
+            for key, record in self._jobs.items()
+            if record["state"] in UNFINISHED_STATES
+        ]
+
+    @callback
+    def async_drop(self, cron_ids: set[str]) -> None:
+        """Give up the unfinished jobs of crons that are gone for good."""
+        for key, cron_id, priority in self.unfinished():
+            if cron_id in cron_ids:
+                self.async_append(key, cron_id, STATE_DROPPED, priority)
+
+    async def async_save(self) -> None:
+        """Write the journal now."""
+        await self._store.async_save(self._data_to_save())
+
+    def _compact(self) -> None:
+        """Fold the appended records into the last state of each unfinished job."""
+        for record in self._records:
+            if record["state"] in UNFINISHED_STATES:
+                self._jobs[record["key"]] = record
+            else:
+                self._jobs.pop(record["key"], None)
+        self._records = []
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the compacted journal to store."""
+        self._compact()
+        return {"records": list(self._jobs.values())}
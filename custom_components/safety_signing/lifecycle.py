@@ -0,0 +1,88 @@
+"""Tasks and resources owned by a config entry, released when it is unloaded."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Coroutine
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EntryLifecycle:
+    """Track the tasks and the resources of one config entry.
+
+    Sign jobs and other background work of the entry run as tracked tasks. On unload
+    the tasks still running are given until a deadline to finish, the others are
+    cancelled, then the resources registered with async_on_close are released in
+    reverse order. Tasks started once closing has begun are cancelled right away.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str) -> None:
+        """Init an open lifecycle."""
+        self._hass = hass
+        self.name = name
+        self._tasks: set[asyncio.Task] = set()
+        self._closers: list[Callable[[], Awaitable[Any]]] = []
+        self.closing = False
+        # Tasks that finished in time, and tasks cancelled, during the last close.
+        self.drained = 0
+        self.cancelled = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of tracked tasks still running."""
+        return len(self._tasks)
+
+    @callback
+    def async_create_task(self, target: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """Run target as a task owned by the entry."""
+        task = self._hass.async_create_task(target)
+        if self.closing:
+            task.cancel()
+            return task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @callback
+    def async_on_close(self, closer: Callable[[], Awaitable[Any]]) -> None:
+        """Release a resource when the entry is unloaded, after the tasks are done."""
+        self._closers.append(closer)
+
+    async def async_close(self, timeout: float) -> tuple[int, int]:
+        """Drain the tasks for up to timeout seconds, cancel the rest, release everything.
+
+        Returns how many tasks were drained and how many were cancelled.
+        """
+        self.closing = True
+        tasks = set(self._tasks)
+        done: set[asyncio.Task] = set()
+        pending: set[asyncio.Task] = set()
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self.drained, self.cancelled = len(done), len(pending)
+
+        closers, self._closers = self._closers, []
+        for closer in reversed(closers):
+            try:
+                await closer()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error releasing a resource of %s", self.name)
+
+        if self.cancelled:
+            _LOGGER.warning(
+                "Unloaded %s: %s tasks drained, %s still running after %ss were cancelled",
+                self.name,
+                self.drained,
+                self.cancelled,
+                timeout,
+            )
+        else:
+            _LOGGER.debug("Unloaded %s: %s tasks drained", self.name, self.drained)
+        return self.drained, self.cancelled
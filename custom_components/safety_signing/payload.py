@@ -0,0 +1,35 @@
+"""Serialization of the autoSign request body."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+def build_sign_payload(
+    google_token: dict[str, Any],
+    token_serial: str,
+    serial_number: str,
+    pin: str,
+    app: str,
+    callback_url: str | None = None,
+) -> bytes:
+    """Return the serialized autoSign body of a cron.
+
+    None of the inputs change between two presses, so crons build this once and
+    send the same bytes until their credentials change. With a callback_url the
+    backend answers with a job id and posts the result there once signed.
+    """
+    body: dict[str, Any] = {
+        "google_token": google_token,
+        "config": {
+            "token": {
+                "tokenSerial": token_serial,
+                "serialNumber": serial_number,
+                "pin": pin,
+                "app": json.dumps(app.split(";")),
+            }
+        },
+    }
+    if callback_url is not None:
+        body["callback_url"] = callback_url
+    return json.dumps(body, separators=(",", ":")).encode()
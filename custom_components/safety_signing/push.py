@@ -0,0 +1,97 @@
+"""Push channel receiving the sign results of a backend over a WebSocket."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DEFAULT_PUSH_BASE_DELAY,
+    DEFAULT_PUSH_HEARTBEAT,
+    DEFAULT_PUSH_MAX_DELAY,
+    PUSH_PATH,
+)
+from .util import backoff_delay
+
+if TYPE_CHECKING:
+    from .api import SigningApi
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SignPushChannel:
+    """Persistent WebSocket subscription to the sign results of one backend.
+
+    The backend answers a long sign with {"job_id": ...} and later pushes a JSON
+    message with the same job_id and the final status. Messages are routed to the
+    sign waiting for them through the job index of the SigningApi. After each
+    (re)connection the ids of the jobs still waiting are sent in a "resume" message,
+    so results pushed while disconnected can be sent again. The connection is shared
+    by every cron of the backend and reopened with capped, jittered backoff.
+    """
+
+    def __init__(self, hass: HomeAssistant, api: SigningApi) -> None:
+        """Init a disconnected channel."""
+        self._hass = hass
+        self._api = api
+        self._task: asyncio.Task | None = None
+        self.connected = False
+        self.reconnects = 0
+
+    @callback
+    def async_start(self) -> None:
+        """Connect in the background, and keep reconnecting until stopped."""
+        if self._task is None:
+            self._task = self._hass.loop.create_task(self._async_run())
+
+    async def async_stop(self) -> None:
+        """Close the connection."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _async_run(self) -> None:
+        """Hold the connection open until cancelled."""
+        attempt = 0
+        while True:
+            try:
+                async with self._api.session.ws_connect(
+                    self._api.base_url + PUSH_PATH, heartbeat=DEFAULT_PUSH_HEARTBEAT
+                ) as websocket:
+                    self.connected = True
+                    _LOGGER.debug("Push channel of %s connected", self._api.base_url)
+                    await websocket.send_json(
+                        {"type": "resume", "job_ids": self._api.pending_job_ids}
+                    )
+                    async for message in websocket:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            # A working connection starts the backoff over.
+                            attempt = 0
+                            self._async_dispatch(message.data)
+                        elif message.type == aiohttp.WSMsgType.ERROR:
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.debug("Push channel of %s failed: %r", self._api.base_url, err)
+            finally:
+                self.connected = False
+            delay = backoff_delay(attempt, DEFAULT_PUSH_BASE_DELAY, DEFAULT_PUSH_MAX_DELAY)
+            attempt += 1
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+
+    @callback
+    def _async_dispatch(self, data: str) -> None:
+        """Hand a pushed result over to the sign waiting for it."""
+        try:
+            message = json.loads(data)
+        except ValueError:
+            _LOGGER.warning("Ignoring invalid push message from %s", self._api.base_url)
+            return
+        if isinstance(message, dict) and message.get("job_id") is not None:
+            self._api.async_resolve_job(str(message["job_id"]), message)
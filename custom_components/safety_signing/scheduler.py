@@ -0,0 +1,178 @@
+"""Scheduled signing of the crons, driven by a single timer."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+import heapq
+import itertools
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.util.dt as dt_util
+
+from .const import DATA_SCHEDULER, PRIORITY_SCHEDULED, SCHEDULER_MAX_SLEEP
+
+if TYPE_CHECKING:
+    from .token import Crons, Token
+
+
+class IntervalSchedule:
+    """Sign every `seconds` seconds, written "every <seconds>"."""
+
+    def __init__(self, seconds: float) -> None:
+        """Init the schedule."""
+        if seconds < 60:
+            raise ValueError("Interval must be at least 60 seconds")
+        self.seconds = seconds
+
+    def next_after(self, after: float) -> float:
+        """Return the next due epoch time after `after`."""
+        return after + self.seconds
+
+
+class CronSchedule:
+    """Sign following a 5 field cron expression, in the local time zone."""
+
+    def __init__(self, expression: str) -> None:
+        """Init and validate the schedule."""
+        # Only needed by entries using cron expressions.
+        from croniter import croniter  # pylint: disable=import-outside-toplevel
+
+        if not croniter.is_valid(expression):
+            raise ValueError(f"Invalid cron expression: {expression}")
+        self._croniter = croniter
+        self.expression = expression
+
+    def next_after(self, after: float) -> float:
+        """Return the next due epoch time after `after`."""
+        start = dt_util.as_local(datetime.fromtimestamp(after, timezone.utc))
+        return self._croniter(self.expression, start).get_next(datetime).timestamp()
+
+
+def parse_schedule(spec: str) -> IntervalSchedule | CronSchedule:
+    """Parse "every <seconds>" or a cron expression, raise ValueError if invalid."""
+    spec = spec.strip()
+    if spec.startswith("every "):
+        return IntervalSchedule(float(spec[len("every "):]))
+    return CronSchedule(spec)
+
+
+def parse_schedules(text: str, serials: list[str]) -> dict[str, IntervalSchedule | CronSchedule]:
+    """Return the schedule of each serial number from the schedule option.
+
+    The option holds specs separated by '|'. A bare spec applies to every serial,
+    "<serial>=<spec>" to a single one and wins over the bare spec.
+    """
+    schedules: dict[str, IntervalSchedule | CronSchedule] = {}
+    default = None
+    for part in filter(None, (part.strip() for part in text.split("|"))):
+        serial, sep, spec = part.partition("=")
+        if not sep:
+            default = parse_schedule(part)
+        elif serial.strip() in serials:
+            schedules[serial.strip()] = parse_schedule(spec)
+        else:
+            raise ValueError(f"Unknown serial number {serial}")
+    if default is not None:
+        for serial in serials:
+            schedules.setdefault(serial, default)
+    return schedules
+
+
+class SignScheduler:
+    """Heap of the next due time of every scheduled cron, behind one timer.
+
+    Whatever the number of schedules, the integration wakes up once per due time and
+    queues every cron due at that time as a scheduled sign job.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Init an empty scheduler."""
+        self._hass = hass
+        self._heap: list[tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        # cron_id -> (cron, schedule, sequence number of its live heap entry).
+        self._entries: dict[str, tuple[Crons, IntervalSchedule | CronSchedule, int]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        """Return the number of scheduled crons."""
+        return len(self._entries)
+
+    @callback
+    def async_add(self, cron: Crons, schedule: IntervalSchedule | CronSchedule) -> None:
+        """Schedule cron, replacing its previous schedule."""
+        self._push(cron, schedule, schedule.next_after(time.time()))
+        self._async_arm()
+
+    @callback
+    def async_remove_token(self, token: Token) -> None:
+        """Unschedule every cron of token. Their heap entries are skipped when due."""
+        for cron in token.crons:
+            self._entries.pop(cron.cron_id, None)
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the timer and forget every schedule."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._heap.clear()
+        self._entries.clear()
+
+    def next_due(self, cron_id: str) -> float | None:
+        """Return the next due epoch time of a cron."""
+        entry = self._entries.get(cron_id)
+        if entry is None:
+            return None
+        return next((due for due, seq, _ in self._heap if seq == entry[2]), None)
+
+    def _push(self, cron: Crons, schedule: IntervalSchedule | CronSchedule, due: float) -> None:
+        """Add the next run of cron to the heap."""
+        seq = next(self._counter)
+        self._entries[cron.cron_id] = (cron, schedule, seq)
+        heapq.heappush(self._heap, (due, seq, cron.cron_id))
+
+    @callback
+    def _async_arm(self) -> None:
+        """Set the timer to the earliest due time."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._heap:
+            return
+        # Long sleeps are cut short so wall clock changes are caught up.
+        delay = min(max(0.0, self._heap[0][0] - time.time()), SCHEDULER_MAX_SLEEP)
+        self._timer = self._hass.loop.call_later(delay, self._async_fire)
+
+    @callback
+    def _async_fire(self) -> None:
+        """Queue every cron that is due and plan their next run."""
+        self._timer = None
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, cron_id = heapq.heappop(self._heap)
+            if not self._is_live(seq, cron_id):
+                continue
+            cron, schedule, _ = self._entries[cron_id]
+            if cron.is_enable == "on":
+                cron.queue_sign(PRIORITY_SCHEDULED)
+            self._push(cron, schedule, schedule.next_after(now))
+        # Drop stale entries left on top by removed crons.
+        while self._heap and not self._is_live(self._heap[0][1], self._heap[0][2]):
+            heapq.heappop(self._heap)
+        self._async_arm()
+
+    def _is_live(self, seq: int, cron_id: str) -> bool:
+        """Return True if the heap entry is the current run of a scheduled cron."""
+        entry = self._entries.get(cron_id)
+        return entry is not None and entry[2] == seq
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> SignScheduler:
+    """Return the integration scheduler, creating it on first use."""
+    if DATA_SCHEDULER not in hass.data:
+        hass.data[DATA_SCHEDULER] = SignScheduler(hass)
+    return hass.data[DATA_SCHEDULER]
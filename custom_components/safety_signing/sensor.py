@@ -13,10 +13,14 @@ from homeassistant.const import (
     DEVICE_CLASS_ILLUMINANCE,
     PERCENTAGE,
 )
+from homeassistant.const import TIME_MILLISECONDS
 from homeassistant.components.device_automation.const import CONF_IS_OFF, CONF_IS_ON
-from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity import Entity, EntityCategory
 from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import callback
 from .const import DOMAIN
+from .entity import CronEntity
 
 
 # See cover.py for more details.
@@ -30,11 +34,14 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add sensors for passed config_entry in HA."""
     token = hass.data[DOMAIN][config_entry.entry_id]
 
-    new_devices = []
-    for cron in token.crons:
-        new_devices.append(BatterySensor(cron))
-            # new_devices.append(IlluminanceSensor(cron))
-            # hass.data[DOMAIN][config_entry.entry_id].set_installed()
+    # Every device of the token is added in a single call, even for large entries.
+    new_devices = [BatterySensor(cron) for cron in token.crons]
+    new_devices += [SignLatencySensor(cron) for cron in token.crons]
+    # Backends may be shared by several entries, the first one using it shows its sensor.
+    for api in token.backends:
+        if api.sensor_owner is None:
+            api.sensor_owner = token
+            new_devices.append(BackendLatencySensor(token, api))
     if new_devices:
         async_add_entities(new_devices)
 
@@ -42,30 +49,12 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 # This base class shows the common properties and methods for a sensor as used in this
 # example. See each sensor for further details about properties and methods that
 # have been overridden.
-class SensorBase(BinarySensorEntity):
+class SensorBase(CronEntity, BinarySensorEntity):
     """Base representation of a Hello World Sensor."""
 
-    should_poll = False
-
     def __init__(self, cron):
         """Initialize the sensor."""
-        self._cron = cron
-
-    # To link this entity to the cover device, this property must return an
-    # identifiers value matching that used in the cover, but no other information such
-    # as name. If name is returned, this entity will then also become a device in the
-    # HA UI.
-    @property
-    def device_info(self):
-        """Return information to link this entity with the correct device."""
-        return {
-            "identifiers": {(DOMAIN, self._cron.cron_id)},
-            # If desired, the name for the device could be different to the entity
-            "name": self.name,
-            "sw_version": self._cron.firmware_version,
-            "model": self._cron.model,
-            "manufacturer": self._cron.token.manufacturer,
-        }
+        super().__init__(cron)
 
 class BatterySensor(SensorBase):
     """Representation of a Sensor."""
@@ -97,17 +86,131 @@ class BatterySensor(SensorBase):
         return "mdi:alarm-light"
 
 
-    # The value of this sensor. As this is a DEVICE_CLASS_BATTERY, this value must be
-    # the battery level as a percentage (between 0 and 100)
-    @property
-    def state(self):
-        """Return the state of the sensor."""
-        return self._cron.is_enable
+    async def async_added_to_hass(self) -> None:
+        """Run when this Entity has been added to HA."""
+        await super().async_added_to_hass()
+        # Pushed by the cron after each sign, written only when something changed.
+        self._cron.register_callback(self.async_write_if_changed)
+        self.async_on_remove(lambda: self._cron.remove_callback(self.async_write_if_changed))
 
+    # The value of this sensor: on while the cron is enabled, i.e. its last sign was
+    # not refused.
     @property
     def is_on(self):
         """Return true if the binary sensor is on."""
-        return self._state
+        return self._cron.is_enable == "on"
+
+    @property
+    def extra_state_attributes(self):
+        """Return the outcome of the last sign, and of the last sign of each app."""
+        return {
+            "last_sign_time": self._cron.last_sign_time,
+            "last_latency": self._cron.last_latency,
+            "last_status": self._cron.last_status,
+            "apps": dict(self._cron.app_status),
+        }
+
+class SignLatencySensor(CronEntity, SensorEntity):
+    """Diagnostic sensor with the sign latency and counters of a cron.
+
+    The state is the rolling p95 latency, the other percentiles, the success, failure
+    and timeout counts, the signs in flight and the last error are attributes.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = TIME_MILLISECONDS
+    _attr_icon = "mdi:timer-outline"
+
+    def __init__(self, cron):
+        """Initialize the sensor."""
+        super().__init__(cron)
+        self._attr_unique_id = f"{self._cron.cron_id}_sign_latency"
+        self._attr_name = f"{self._cron.name} Sign latency"
+
+    async def async_added_to_hass(self) -> None:
+        """Run when this Entity has been added to HA."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._cron.telemetry.add_listener(self.async_write_if_changed))
+
+    @property
+    def native_value(self):
+        """Return the p95 sign latency."""
+        return self._cron.telemetry.summary["p95"]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the other telemetry of the cron."""
+        return self._cron.telemetry.summary
+
+
+class BackendLatencySensor(SensorEntity):
+    """Diagnostic sensor with the sign latency and counters of a backend.
+
+    There is one per backend, owned by the first entry using it. Like the cron
+    entities, the state is only written when something it exposes changed.
+    """
+
+    should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = TIME_MILLISECONDS
+    _attr_icon = "mdi:server-network"
+
+    def __init__(self, token, api):
+        """Initialize the sensor."""
+        self._token = token
+        self._api = api
+        self._written_state = None
+        self._attr_unique_id = f"backend_sign_latency_{api.base_url}"
+        self._attr_name = f"Backend sign latency {api.base_url}"
+
+    @property
+    def device_info(self):
+        """Return information about the backend device."""
+        return {
+            "identifiers": {(DOMAIN, f"backend_{self._api.base_url}")},
+            "name": f"SafetySigning backend {self._api.base_url}",
+            "manufacturer": self._token.manufacturer,
+        }
+
+    @property
+    def available(self) -> bool:
+        """Return False while the backend is taken out of the rotation."""
+        return self._api.available
+
+    async def async_added_to_hass(self) -> None:
+        """Run when this Entity has been added to HA."""
+        self._written_state = self._state_snapshot()
+        self.async_on_remove(self._api.telemetry.add_listener(self.async_write_if_changed))
+        self.async_on_remove(self._api.coordinator.async_add_listener(self.async_write_if_changed))
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Let the next entry set up with the backend show its sensor."""
+        if self._api.sensor_owner is self._token:
+            self._api.sensor_owner = None
+
+    def _state_snapshot(self):
+        """Return everything this entity exposes to the state machine."""
+        return (self.available, self.native_value, self.extra_state_attributes)
+
+    @callback
+    def async_write_if_changed(self) -> None:
+        """Write the state to HA, unless it is the same as the last one written."""
+        snapshot = self._state_snapshot()
+        if snapshot == self._written_state:
+            return
+        self._written_state = snapshot
+        self.async_write_ha_state()
 
-# This is another sensor, but more simple compared to the battery above. See the
-# comments above for how each field works.
\ No newline at end of file
+    @property
+    def native_value(self):
+        """Return the p95 sign latency."""
+        return self._api.telemetry.summary["p95"]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the other telemetry and the concurrency limit of the backend."""
+        return {
+            **self._api.telemetry.summary,
+            "concurrency_limit": self._api.limiter.limit,
+            "rejections": self._api.limiter.rejections,
+        }
@@ -0,0 +1,111 @@
+"""Services of the SafetySigning integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .api import SigningApiError
+from .const import (
+    DEFAULT_SIGN_MANY_CONCURRENCY,
+    DOMAIN,
+    EVENT_SIGN_MANY_RESULT,
+    SERVICE_SIGN_MANY,
+)
+
+try:
+    from homeassistant.core import SupportsResponse
+except ImportError:  # Home Assistant without service responses (before 2023.7).
+    SupportsResponse = None
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_CONCURRENCY = "concurrency"
+
+SIGN_MANY_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional(ATTR_CONCURRENCY, default=DEFAULT_SIGN_MANY_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+    if hass.services.has_service(DOMAIN, SERVICE_SIGN_MANY):
+        return
+
+    async def async_sign_many(call: ServiceCall) -> dict[str, Any]:
+        """Sign with the crons of every targeted entity or device."""
+        referenced = async_extract_referenced_entity_ids(hass, call)
+        entity_ids = referenced.referenced | referenced.indirectly_referenced
+        # Several entities of a cron may be targeted, the cron signs once for all.
+        crons = {}
+        for token in hass.data.get(DOMAIN, {}).values():
+            for cron in token.crons:
+                targeted = sorted(cron.entity_ids & entity_ids)
+                if targeted:
+                    crons[cron.cron_id] = (cron, targeted)
+
+        parallelism = asyncio.Semaphore(call.data[ATTR_CONCURRENCY])
+
+        async def _async_sign(cron) -> dict[str, Any]:
+            if cron.is_enable != "on":
+                # As for the cover, a disabled cron does not sign.
+                return {"status": "disabled", "latency": None, "error": None}
+            async with parallelism:
+                started = time.monotonic()
+                error = None
+                # A task of the entry of the cron, cancelled if the entry is unloaded.
+                sign = cron.start_sign()
+                try:
+                    await asyncio.shield(sign)
+                except asyncio.CancelledError:
+                    if not sign.cancelled():
+                        raise
+                    error = "Cancelled, the entry was unloaded"
+                except SigningApiError as err:
+                    error = str(err)
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.exception("Sign of %s failed", cron.cron_id)
+                    error = str(err) or type(err).__name__
+                latency = round((time.monotonic() - started) * 1000, 1)
+            await cron.publish_updates()
+            return {
+                "status": "error" if error else cron.is_enable,
+                "latency": latency,
+                "error": error,
+            }
+
+        outcomes = await asyncio.gather(*(_async_sign(cron) for cron, _ in crons.values()))
+        results = {
+            entity_id: outcome
+            for (_, targeted), outcome in zip(crons.values(), outcomes)
+            for entity_id in targeted
+        }
+        # Also fired as an event, for the versions without service responses.
+        hass.bus.async_fire(EVENT_SIGN_MANY_RESULT, {"results": results}, context=call.context)
+        return {"results": results}
+
+    if SupportsResponse is not None:
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SIGN_MANY,
+            async_sign_many,
+            schema=SIGN_MANY_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+    else:
+        hass.services.async_register(
+            DOMAIN, SERVICE_SIGN_MANY, async_sign_many, schema=SIGN_MANY_SCHEMA
+        )
@@ -0,0 +1,139 @@
+"""Lightweight instrumentation of the signing pipeline."""
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from collections.abc import Callable
+import time
+from typing import Any
+
+from .const import TELEMETRY_WINDOW
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (
+    0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75,
+    1, 1.5, 2, 3, 5, 7.5, 10, 15, 20, 30, 60, 120,
+)
+
+
+class LatencyHistogram:
+    """Fixed-size latency histogram over a rolling window.
+
+    Samples go into the current window, percentiles are read from the current and
+    the previous one. Windows rotate every `window` seconds, so memory stays the same
+    whatever the sign rate is.
+    """
+
+    def __init__(self, window: float = TELEMETRY_WINDOW) -> None:
+        """Init empty windows."""
+        self._window = window
+        self._window_start = time.monotonic()
+        self._current = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._previous = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._max = 0.0
+
+    def _rotate(self) -> None:
+        """Start a new window when the current one is over."""
+        elapsed = time.monotonic() - self._window_start
+        if elapsed < self._window:
+            return
+        if elapsed < 2 * self._window:
+            self._previous = self._current
+        else:
+            self._previous = [0] * len(self._current)
+        self._current = [0] * len(self._current)
+        self._window_start = time.monotonic()
+        self._max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record one latency sample."""
+        self._rotate()
+        self._current[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self._max = max(self._max, seconds)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the estimated latency percentile in seconds, None without samples."""
+        self._rotate()
+        counts = [cur + prev for cur, prev in zip(self._current, self._previous)]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = fraction * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else max(self._max, lower)
+                # Linear interpolation inside the bucket.
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self._max
+
+
+class SignTelemetry:
+    """Counters and latency of the signs of a cron or a backend."""
+
+    def __init__(self) -> None:
+        """Init empty counters."""
+        self.latency = LatencyHistogram()
+        self.success = 0
+        self.failure = 0
+        self.timeout = 0
+        self.in_flight = 0
+        self.last_error: str | None = None
+        self._listeners: list[Callable[[], None]] = []
+        self._notify_handle: asyncio.Handle | None = None
+
+    @property
+    def summary(self) -> dict[str, Any]:
+        """Return the telemetry as state attributes, latencies in milliseconds."""
+        return {
+            "p50": _to_ms(self.latency.percentile(0.50)),
+            "p95": _to_ms(self.latency.percentile(0.95)),
+            "p99": _to_ms(self.latency.percentile(0.99)),
+            "success": self.success,
+            "failure": self.failure,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "last_error": self.last_error,
+        }
+
+    def sign_started(self) -> None:
+        """Record the start of a sign."""
+        self.in_flight += 1
+        self._schedule_notify()
+
+    def sign_finished(self, seconds: float, error: BaseException | str | None) -> None:
+        """Record the end of a sign, error is None when it succeeded."""
+        self.in_flight -= 1
+        self.latency.add(seconds)
+        if error is None:
+            self.success += 1
+        else:
+            if getattr(error, "timeout", False):
+                self.timeout += 1
+            else:
+                self.failure += 1
+            self.last_error = str(error) or type(error).__name__
+        self._schedule_notify()
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener when the telemetry changed, return a remove function."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _schedule_notify(self) -> None:
+        """Tell the listeners once per loop tick, however many signs changed."""
+        if self._listeners and self._notify_handle is None:
+            self._notify_handle = asyncio.get_running_loop().call_soon(self._notify)
+
+    def _notify(self) -> None:
+        """Call the listeners."""
+        self._notify_handle = None
+        for listener in list(self._listeners):
+            listener()
+
+
+def _to_ms(seconds: float | None) -> float | None:
+    """Convert seconds to rounded milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
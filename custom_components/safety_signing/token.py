@@ -7,32 +7,106 @@ from __future__ import annotations
 # for more information.
 # This dummy token always returns 1 cron.
 import asyncio
-import json
+import hashlib
 import random
-import requests
-from homeassistant.core import HomeAssistant
-from .const import API_URL
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.util.dt as dt_util
+
+from .api import SigningApi
+from .balancer import SigningBalancer, is_signed
+from .auth import CredentialCache
+from .lifecycle import EntryLifecycle
+from .payload import build_sign_payload
+from .telemetry import SignTelemetry
+from .const import (
+    CONF_BATCH_WINDOW,
+    CONF_CONNECT_TIMEOUT,
+    CONF_PER_APP,
+    CONF_READ_TIMEOUT,
+    CONF_SPREAD_WINDOW,
+    DEFAULT_APP_PARALLELISM,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RESULT_CACHE_SIZE,
+    DEFAULT_RESULT_TTL,
+    DEFAULT_SPREAD_JITTER,
+    DEFAULT_SPREAD_WINDOW,
+    PRIORITY_MANUAL,
+    STATE_WRITE_DEBOUNCE,
+)
+from .util import SingleFlight, TTLCache, spread_offset
+
+if TYPE_CHECKING:
+    from .jobs import SignJobQueue
+
+def parse_devices(serial_number: str, app: str) -> list[tuple[str, str]]:
+    """Split the entry config into (serial_number, app) pairs, one per device.
+
+    Serial numbers are separated by ','. The app field holds either one app set used
+    by every device or one set per serial number, also separated by ','. Apps inside
+    a set are separated by ';'.
+    """
+    serials = [serial.strip() for serial in serial_number.split(",")]
+    apps = [device_app.strip() for device_app in app.split(",")]
+    if len(apps) == 1:
+        apps = apps * len(serials)
+    if len(apps) != len(serials):
+        raise ValueError("Expected one app set, or one per serial number")
+    return list(zip(serials, apps))
+
+
+def _fingerprint(payload: bytes) -> bytes:
+    """Return a short digest identifying a sign body."""
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
 
 class Token:
     """Dummy token for Hello World example."""
 
     manufacturer = "TS24 Corporation"
 
-    def __init__(self, hass: HomeAssistant, name: str, token_serial: str, serial_number: str, access_token: str, pin: str, app: str) -> None:
+    def __init__(self, hass: HomeAssistant, name: str, token_serial: str, serial_number: str, access_token: str, pin: str, app: str, options: dict[str, Any] | None = None) -> None:
         """Init dummy token."""
         self._name = name
         self._token_serial = token_serial
         self._serial_number = serial_number
-        self._access_token = json.loads(access_token)
+        # Google credentials, refreshed in the background before they expire.
+        self.credentials = CredentialCache(hass, access_token)
         self._pin = pin
         self._app = app
         self._hass = hass
         self._id = name.replace(" ", "_").lower()
         self._installed = False
+        self.options = options or {}
+        # Shared clients of the backends, the balancer spreading the signs over them and
+        # the job queue, attached by __init__.async_setup_entry.
+        self.backends: list[SigningApi] = []
+        self.balancer: SigningBalancer | None = None
+        self.jobs: SignJobQueue | None = None
+        # Tasks and resources of the entry, released when it is unloaded.
+        self.lifecycle = EntryLifecycle(hass, name)
+        # Webhook the backend posts the results to in asynchronous mode, see webhook.py.
+        self.webhook_url: str | None = None
+        # Sign requests in flight, keyed by cron_id. A press arriving while the cron
+        # is already signing waits for that result instead of signing again. The signs
+        # are tasks of the entry, drained or cancelled when it is unloaded.
+        self.sign_flights = SingleFlight(self.lifecycle.async_create_task)
+        # Recent answers of the backend, by (cron_id, fingerprint of the sign body).
+        self.results = TTLCache(DEFAULT_RESULT_CACHE_SIZE, DEFAULT_RESULT_TTL)
 
+        # One cron per signing device. Large entries hold hundreds of them, so they are
+        # also indexed by cron_id.
         self.crons = [
-            Crons(f"{self._id}_"+serial_number, f"Schedule {serial_number} {app.replace(';', ',')}", self),
+            Crons(f"{self._id}_"+device_serial, f"Schedule {device_serial} {device_app.replace(';', ',')}", self, device_serial, device_app)
+            for device_serial, device_app in parse_devices(serial_number, app)
         ]
+        self._crons_by_id = {cron.cron_id: cron for cron in self.crons}
+        # The serialized sign bodies embed the credentials.
+        self.credentials.add_listener(self._invalidate_payloads)
         self.online = True
 
     @property
@@ -40,26 +114,66 @@ class Token:
         """ID for dummy token."""
         return self._id
 
+    def get_cron(self, cron_id: str) -> Crons | None:
+        """Return the cron with the given cron_id."""
+        return self._crons_by_id.get(cron_id)
+
     def installed(self) -> None:
         return self._installed
 
     def set_installed(self) -> None:
         self._installed = True
 
+    def _invalidate_payloads(self) -> None:
+        """Rebuild the sign bodies of the crons after a credentials refresh."""
+        for cron in self.crons:
+            cron.invalidate_payload()
+
+    @callback
+    def async_publish_all(self) -> None:
+        """Publish the state of every cron, e.g. after the backend availability changed."""
+        for cron in self.crons:
+            self.lifecycle.async_create_task(cron.publish_updates())
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop telling the entities about the crons, once the entry is unloaded."""
+        for cron in self.crons:
+            cron.async_stop()
+
 class Crons:
     """Dummy cron (device for HA) for Hello World example."""
 
-    def __init__(self, cronid: str, name: str, token: token) -> None:
+    def __init__(self, cronid: str, name: str, token: token, serial_number: str, app: str) -> None:
         """Init dummy cron."""
         self._id = cronid
         self.token = token
         self.name = name
         self.token_serial = token._token_serial
-        self.serial_number = token._serial_number
-        self.access_token = token._access_token
+        self.serial_number = serial_number
         self.pin = token._pin
-        self.app = token._app
+        self.app = app
+        self.apps = app.split(";")
+        # Outcome of the last sign of each app: "on", "off" when refused, or the error.
+        self.app_status: dict[str, str | None] = dict.fromkeys(self.apps)
         self._callbacks = set()
+        # End time (ISO 8601), latency in ms and outcome ("on", "off" or "error") of
+        # the last sign.
+        self.last_sign_time: str | None = None
+        self.last_latency: float | None = None
+        self.last_status: str | None = None
+        # Entity ids of the entities of this cron, used to resolve service targets.
+        self.entity_ids: set[str] = set()
+        self._flush_handle: asyncio.Handle | None = None
+        # Latency and outcome of the signs of this cron.
+        self.telemetry = SignTelemetry()
+        # State writes of the entities of this cron, see entity.CronEntity.
+        self.state_writes = {"emitted": 0, "suppressed": 0}
+        # Seconds the last queued sign waited for its spread-out start.
+        self.dispatch_delay = 0.0
+        # Serialized autoSign body, built on first use and whenever the credentials change.
+        self._payload: bytes | None = None
+        self._app_payloads: dict[str, bytes] = {}
         self._loop = asyncio.get_event_loop()
         self._target_position = 100
         self._current_position = 100
@@ -84,6 +198,11 @@ class Crons:
     def get_serial_number(self) -> str:
         return self.serial_number
     
+    @property
+    def access_token(self) -> dict[str, Any]:
+        """Return the current Google credentials of the token."""
+        return self.token.credentials.token
+
     @property
     def get_access_token(self) -> str:
         return self.access_token
@@ -106,7 +225,7 @@ class Crons:
         """
         Set dummy cover to the given position.
 
-        State is announced a random number of seconds later.
+        The cron stops moving when the sign queued with it is done, see _async_sign.
         """
         self._target_position = position
 
@@ -114,36 +233,148 @@ class Crons:
         self.moving = position - 50
         await self.publish_updates()
 
-        self._loop.create_task(self.delayed_update())
-
-    async def running_cron(self) -> None:
-        requestHeaders = {
-            "Content-Type": "application/json",
-        }
-        requestBody = {
-            "google_token": self.access_token,
-            "config": {
-                "token": {
-                    "tokenSerial": self.token_serial,
-                    "serialNumber": self.serial_number,
-                    "pin": self.pin,
-                    "app": json.dumps(self.app.split(';'))
-                }
-            }
-        }
-        requestURL = API_URL + "/autoSign"
-        # future = self._loop.run_in_executor(None, requests.post, requestURL, data=json.dumps(requestBody), headers=requestHeaders)
-        response = await self.token._hass.async_add_executor_job(lambda: requests.post(requestURL, data=json.dumps(requestBody), headers=requestHeaders))
-        # response = asyncio.run_coroutine_threadsafe(
-        #     requests.post(requestURL, data=json.dumps(requestBody), headers=requestHeaders), 1
-        # ).result()
-
-        if response:
-            response = response.json()
-            if "status" not in response or response["status"] != 0:
-                self._enable = "off"
+    @property
+    def payload(self) -> bytes:
+        """Return the serialized autoSign body of the cron."""
+        if self._payload is None:
+            self._payload = build_sign_payload(
+                self.access_token, self.token_serial, self.serial_number, self.pin, self.app, self.token.webhook_url
+            )
+        return self._payload
+
+    def app_payload(self, app: str) -> bytes:
+        """Return the serialized autoSign body signing only app."""
+        if app not in self._app_payloads:
+            self._app_payloads[app] = build_sign_payload(
+                self.access_token, self.token_serial, self.serial_number, self.pin, app, self.token.webhook_url
+            )
+        return self._app_payloads[app]
+
+    def invalidate_payload(self) -> None:
+        """Drop the serialized bodies, they are rebuilt on the next sign."""
+        self._payload = None
+        self._app_payloads = {}
+
+    def queue_sign(self, priority: int = PRIORITY_MANUAL, spread: bool = True) -> bool:
+        """Queue a background sign, the new state is published when it is done.
+
+        Unless spread is False, the sign starts within the spread window of the entry,
+        so crons fired at the same time do not all hit the backend at once.
+        """
+        window = self.token.options.get(CONF_SPREAD_WINDOW, DEFAULT_SPREAD_WINDOW) if spread else 0
+        delay = spread_offset(self._id, window, DEFAULT_SPREAD_JITTER)
+        if not self.token.jobs.async_enqueue(self, priority, delay=delay):
+            return False
+        self.dispatch_delay = delay
+        return True
+
+    async def running_cron(self, idempotency_key: str | None = None) -> None:
+        """Sign with this cron, joining the sign already in flight if any.
+
+        The idempotency key lets the backend recognise a job sent again, e.g. when it
+        is replayed from the journal after a restart. Signs started outside of the job
+        queue get the key of their body, see idempotency_key.
+        """
+        await asyncio.shield(self.start_sign(idempotency_key))
+
+    def start_sign(self, idempotency_key: str | None = None) -> asyncio.Future[None]:
+        """Start signing with this cron unless it already signs, return the sign."""
+        return self.token.sign_flights.start(
+            self._id, lambda: self._async_sign(idempotency_key or self.idempotency_key())
+        )
+
+    def idempotency_key(self) -> str:
+        """Return the key of a new sign, shared by the same body sent in the same time bucket.
+
+        A sign sent twice within DEFAULT_RESULT_TTL seconds, e.g. by a retrying
+        automation, is recognised by the backend even when it is not answered from the
+        result cache.
+        """
+        bucket = int(time.time() // DEFAULT_RESULT_TTL)
+        return f"{self._id}-{_fingerprint(self.payload).hex()}-{bucket}"
+
+    async def _async_sign(self, idempotency_key: str | None) -> None:
+        """Sign the apps of the cron and update the cron state from the answers."""
+        self.telemetry.sign_started()
+        started = time.monotonic()
+        error: BaseException | str | None = None
+        try:
+            if self.token.options.get(CONF_PER_APP) and len(self.apps) > 1:
+                error = await self._async_sign_per_app(idempotency_key)
             else:
-                self._enable = "on"
+                response = await self._async_send(self.payload, idempotency_key)
+                if not is_signed(response):
+                    error = f"Sign refused: {response!r}"
+                self.app_status = dict.fromkeys(self.apps, "off" if error else "on")
+            self._enable = "off" if error else "on"
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            self.moving = 0
+            elapsed = time.monotonic() - started
+            self.telemetry.sign_finished(elapsed, error)
+            self.last_sign_time = dt_util.utcnow().isoformat()
+            self.last_latency = round(elapsed * 1000, 1)
+            self.last_status = "error" if isinstance(error, BaseException) else self._enable
+
+    async def _async_sign_per_app(self, idempotency_key: str | None) -> str | None:
+        """Sign each app with its own request, return why the sign was refused if it was.
+
+        Each app is published as soon as it is done, so a slow app does not hold the
+        others back. Errors only raise when no app was refused, as in a single request.
+        """
+        parallelism = asyncio.Semaphore(DEFAULT_APP_PARALLELISM)
+
+        async def _async_sign_app(app: str) -> None:
+            async with parallelism:
+                try:
+                    response = await self._async_send(
+                        self.app_payload(app),
+                        f"{idempotency_key}-{app}" if idempotency_key else None,
+                    )
+                except Exception as err:
+                    self.app_status[app] = str(err) or type(err).__name__
+                    raise
+                else:
+                    self.app_status[app] = "on" if is_signed(response) else "off"
+                finally:
+                    await self.publish_updates()
+
+        results = await asyncio.gather(
+            *(_async_sign_app(app) for app in self.apps), return_exceptions=True
+        )
+        refused = [app for app in self.apps if self.app_status[app] == "off"]
+        if refused:
+            return f"Sign refused for {', '.join(refused)}"
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return None
+
+    async def _async_send(self, payload: bytes, idempotency_key: str | None) -> Any:
+        """Send one autoSign body and return the answer of the backend.
+
+        The same body sent again within DEFAULT_RESULT_TTL seconds gets the previous
+        answer back without calling the backend.
+        """
+        cache_key = (self._id, _fingerprint(payload))
+        cached = self.token.results.get(cache_key)
+        if cached is not None:
+            return cached
+        options = self.token.options
+        # Batched together with the requests of the other crons using the backend.
+        # Transient failures are retried, then tried on the other backends, and raise
+        # once all are exhausted so a backend outage does not switch the cron off.
+        response = await self.token.balancer.async_sign(
+            payload,
+            window=options.get(CONF_BATCH_WINDOW, DEFAULT_BATCH_WINDOW),
+            connect_timeout=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+            read_timeout=options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT),
+            idempotency_key=idempotency_key,
+        )
+        self.token.results.put(cache_key, response)
+        return response
 
     async def turn_off_cron(self) -> None:
         self._enable = "off"
@@ -154,12 +385,6 @@ class Crons:
         else:
             self._enable = "on"
 
-    async def delayed_update(self) -> None:
-        """Publish updates, with a random delay to emulate interaction with device."""
-        await asyncio.sleep(random.randint(1, 10))
-        self.moving = 0
-        await self.publish_updates()
-
     def register_callback(self, callback: Callable[[], None]) -> None:
         """Register callback, called when cron changes state."""
         self._callbacks.add(callback)
@@ -173,15 +398,32 @@ class Crons:
     async def publish_updates(self) -> None:
         """Schedule call all registered callbacks."""
         self._current_position = self._target_position
-        for callback in self._callbacks:
-            callback()
+        # Updates published in a burst are coalesced into one call of each callback.
+        if self._flush_handle is None:
+            if STATE_WRITE_DEBOUNCE > 0:
+                self._flush_handle = self._loop.call_later(STATE_WRITE_DEBOUNCE, self._flush_updates)
+            else:
+                self._flush_handle = self._loop.call_soon(self._flush_updates)
+
+    @callback
+    def async_stop(self) -> None:
+        """Drop the pending state update and every callback."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._callbacks.clear()
+
+    def _flush_updates(self) -> None:
+        """Call all registered callbacks."""
+        self._flush_handle = None
+        for listener in list(self._callbacks):
+            listener()
 
     @property
-    def online(self) -> float:
+    def online(self) -> bool:
         """cron is online."""
-        # The dummy cron is offline about 10% of the time. Returns True if online,
-        # False if offline.
-        return random.random() > 0.1
+        # Offline while every backend is unhealthy or has its circuit breaker open.
+        return self.token.balancer is not None and self.token.balancer.available
 
     @property
     def is_enable(self) -> bool:
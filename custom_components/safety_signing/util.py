@@ -0,0 +1,342 @@
+"""Small asyncio helpers shared by the signing pipeline."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import Callable, Coroutine, Hashable
+import hashlib
+import random
+import time
+from typing import Any, TypeVar
+
+_T = TypeVar("_T")
+
+
+class SingleFlight:
+    """Run at most one call per key at a time.
+
+    Callers arriving while a call for the same key is still running await that call's
+    result instead of starting a new one. Calls are started with create_task, so
+    their owner can cancel them.
+    """
+
+    def __init__(
+        self,
+        create_task: Callable[[Coroutine[Any, Any, Any]], asyncio.Future[Any]] = asyncio.ensure_future,
+    ) -> None:
+        """Init an empty in-flight registry."""
+        self._create_task = create_task
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of calls currently in flight."""
+        return len(self._inflight)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Return True if a call for key is running."""
+        return key in self._inflight
+
+    def start(
+        self, key: Hashable, factory: Callable[[], Coroutine[Any, Any, _T]]
+    ) -> asyncio.Future[_T]:
+        """Start factory() for key unless a call is running for it, return that call."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._create_task(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    async def async_run(
+        self, key: Hashable, factory: Callable[[], Coroutine[Any, Any, _T]]
+    ) -> _T:
+        """Run factory() for key, or join the call already running for it."""
+        # Shielded so a caller giving up does not cancel the call for everyone else.
+        return await asyncio.shield(self.start(key, factory))
+
+    def _forget(self, key: Hashable, future: asyncio.Future[Any]) -> None:
+        """Drop a finished call from the registry."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved, all the waiters may have been cancelled.
+        if not future.cancelled():
+            future.exception()
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Return a full-jitter exponential backoff delay for the given attempt (0 based)."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """Fail fast while a backend keeps failing.
+
+    After failure_threshold consecutive failures the breaker opens and rejects calls.
+    Once reset_timeout seconds have passed it is half-open and lets a single probe
+    through: a success closes it again, a failure re-opens it.
+    """
+
+    STATE_CLOSED = "closed"
+    STATE_OPEN = "open"
+    STATE_HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """Init a closed breaker."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._listeners: list[Callable[[], None]] = []
+        self._half_open_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def state(self) -> str:
+        """Return the current state of the breaker."""
+        if self._opened_at is None:
+            return self.STATE_CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.STATE_HALF_OPEN
+        return self.STATE_OPEN
+
+    def allow(self) -> bool:
+        """Return True if a call may be sent now."""
+        state = self.state
+        if state == self.STATE_CLOSED:
+            return True
+        if state == self.STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        was_open = self._opened_at is not None
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._cancel_half_open()
+        if was_open:
+            self._notify()
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker past the threshold."""
+        self.failures += 1
+        was_open = self._opened_at is not None
+        if self._probing or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._probing = False
+            # Tell the listeners again when the breaker turns half-open.
+            self._cancel_half_open()
+            self._half_open_handle = asyncio.get_running_loop().call_later(
+                self.reset_timeout, self._notify
+            )
+            if not was_open:
+                self._notify()
+
+    def release_probe(self) -> None:
+        """Let another probe through, the last one ended without an outcome."""
+        self._probing = False
+
+    def stop(self) -> None:
+        """Cancel the pending timers of the breaker."""
+        self._cancel_half_open()
+
+    def _cancel_half_open(self) -> None:
+        """Cancel the pending half-open notification."""
+        if self._half_open_handle is not None:
+            self._half_open_handle.cancel()
+            self._half_open_handle = None
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener when the breaker opens or closes, return a remove function."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        """Call the listeners."""
+        for listener in list(self._listeners):
+            listener()
+
+
+def spread_offset(key: str, window: float, jitter: float) -> float:
+    """Return a start offset in [0, window) for key.
+
+    The offset is mostly deterministic, hashed from key, so the same keys always
+    start spread the same way, plus up to `jitter` seconds of random noise.
+    """
+    if window <= 0:
+        return 0.0
+    jitter = min(jitter, window)
+    fraction = int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) / 0x100000000
+    return fraction * (window - jitter) + random.uniform(0, jitter)
+
+
+class ConcurrencyLimiter:
+    """Async context manager allowing at most `limit` holders at a time.
+
+    Unlike asyncio.Semaphore the limit can change while it is in use.
+    """
+
+    def __init__(self, limit: int) -> None:
+        """Init the limiter."""
+        self.limit = limit
+        self.active = 0
+        self.peak = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of callers waiting for a slot."""
+        return len(self._waiters)
+
+    def set_limit(self, limit: int) -> None:
+        """Change the limit, waking waiters if it grew."""
+        self.limit = max(1, limit)
+        self._wake()
+
+    async def __aenter__(self) -> None:
+        """Wait for a free slot."""
+        while self.active >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                if not waiter.cancelled():
+                    # Woken but cancelled before taking the slot, pass it on.
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Free the slot."""
+        self.active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Wake as many waiters as there are free slots."""
+        free = self.limit - self.active
+        for waiter in list(self._waiters)[: max(0, free)]:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class LimitExceeded(Exception):
+    """Raised by an AdaptiveLimiter when its waiting line is full."""
+
+
+class AdaptiveLimiter(ConcurrencyLimiter):
+    """Concurrency limiter adjusting its limit to the latency it observes (AIMD).
+
+    The limit grows by one each time `limit` calls in a row finish within
+    `tolerance` times the baseline latency, and is multiplied by `backoff` when a
+    call is overloaded or slower than that, once per wave of calls. The baseline
+    follows the fastest successful calls and slowly drifts up with lasting changes,
+    errors and other quick answers never lower it.
+    Callers over the limit wait, at most `max_waiting` of them, the others are
+    rejected at once with LimitExceeded.
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        max_waiting: int,
+        tolerance: float,
+        backoff: float,
+    ) -> None:
+        """Init the limiter at its maximum."""
+        super().__init__(max_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_waiting = max_waiting
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baseline: float | None = None
+        self.rejections = 0
+        self._growth = 0.0
+        self._last_cut = 0.0
+
+    def set_max_limit(self, max_limit: int) -> None:
+        """Change the highest limit, lowering the current one if needed."""
+        self.max_limit = max(self.min_limit, max_limit)
+        if self.limit > self.max_limit:
+            self.set_limit(self.max_limit)
+
+    async def __aenter__(self) -> None:
+        """Wait for a free slot, or raise LimitExceeded if too many callers wait."""
+        if self.active >= self.limit and self.waiting >= self.max_waiting:
+            self.rejections += 1
+            raise LimitExceeded
+        await super().__aenter__()
+
+    def record(
+        self, started: float, latency: float, success: bool = True, overloaded: bool = False
+    ) -> None:
+        """Adjust the limit after a call started at `started` (monotonic time).
+
+        Only successful calls teach the baseline, the others only count as slow or
+        overloaded.
+        """
+        if success:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += (latency - self.baseline) * 0.01
+        slow = self.baseline is not None and latency > self.baseline * self.tolerance
+        if overloaded or slow:
+            # Calls started before the last cut saw the old limit, they do not cut again.
+            if started >= self._last_cut:
+                self._last_cut = time.monotonic()
+                self._growth = 0.0
+                self.set_limit(max(self.min_limit, int(self.limit * self.backoff)))
+            return
+        self._growth += 1 / self.limit
+        if self._growth >= 1 and self.limit < self.max_limit:
+            self._growth = 0.0
+            self.set_limit(self.limit + 1)
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl` seconds after being stored.
+
+    The least recently used entry is evicted when full. Lookups count hits and misses.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """Init an empty cache."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of entries, expired ones included until looked up."""
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the live value stored for key, None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value for key, evicting the least recently used entry if full."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
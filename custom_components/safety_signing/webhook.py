@@ -0,0 +1,60 @@
+"""Webhook receiving the sign results of the entries in asynchronous mode."""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from homeassistant.components import webhook
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .token import Token
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_register_webhook(
+    hass: HomeAssistant, webhook_id: str, token: Token
+) -> CALLBACK_TYPE:
+    """Receive the results of the jobs of token on a webhook, return an unregister function.
+
+    The backend posts {"job_id": ..., "status": ...} once a job accepted in
+    asynchronous mode is signed. The result is routed to the waiting sign through the
+    job index of the backend clients, as for the push channel.
+    """
+
+    async def async_handle_webhook(
+        hass: HomeAssistant, webhook_id: str, request: web.Request
+    ) -> web.Response:
+        """Hand a posted result over to the sign waiting for it."""
+        try:
+            result = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(result, dict) or result.get("job_id") is None:
+            return web.Response(status=400)
+        if token.balancer is None:
+            return web.Response(status=503)
+        token.balancer.async_resolve_job(str(result["job_id"]), result)
+        return web.Response(status=200)
+
+    webhook.async_register(
+        hass, DOMAIN, f"SafetySigning {token.token_id}", webhook_id, async_handle_webhook
+    )
+    return lambda: webhook.async_unregister(hass, webhook_id)
+
+
+@callback
+def async_webhook_url(hass: HomeAssistant, webhook_id: str) -> str | None:
+    """Return the URL the backend posts results to, None if HA has no known URL."""
+    try:
+        return webhook.async_generate_url(hass, webhook_id)
+    except Exception as err:  # pylint: disable=broad-except
+        # NoURLAvailableError when neither an internal nor an external URL is set.
+        _LOGGER.warning("No URL for the sign results webhook, signing synchronously: %s", err)
+        return None
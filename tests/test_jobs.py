@@ -0,0 +1,136 @@
+"""Tests for the sign job queue and its journal."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.safety_signing.jobs import SignJobQueue
+from custom_components.safety_signing.journal import (
+    STATE_DONE,
+    STATE_IN_PROGRESS,
+    STATE_PENDING,
+    SignJournal,
+)
+
+
+class FakeCron:
+    """Cron recording the keys it signs with."""
+
+    def __init__(self, cron_id: str, release: asyncio.Event | None = None) -> None:
+        """Init a cron of an open entry, signing once release is set if given."""
+        self.cron_id = cron_id
+        self.closed = False
+        self.signed: list[str] = []
+        self.published = 0
+        self._release = release
+
+    def start_sign(self, idempotency_key: str) -> asyncio.Future:
+        """Sign, or cancel the sign as a closed entry lifecycle does."""
+        if self._release is not None:
+            sign = asyncio.ensure_future(self._release.wait())
+        else:
+            sign = asyncio.ensure_future(asyncio.sleep(0))
+        if self.closed:
+            sign.cancel()
+        else:
+            self.signed.append(idempotency_key)
+        return sign
+
+    def idempotency_key(self) -> str:
+        """Return a fixed key."""
+        return f"{self.cron_id}-key"
+
+    async def publish_updates(self) -> None:
+        """Count the updates."""
+        self.published += 1
+
+
+class FakeToken:
+    """Token owning the given crons."""
+
+    token_id = "test"
+
+    def __init__(self, *crons: FakeCron) -> None:
+        """Init the token."""
+        self.crons = list(crons)
+
+    def get_cron(self, cron_id: str) -> FakeCron | None:
+        """Return the cron with that id."""
+        return next((cron for cron in self.crons if cron.cron_id == cron_id), None)
+
+
+async def test_journal_forgets_finished_jobs(hass, hass_storage) -> None:
+    """Only the jobs still to replay are kept."""
+    journal = SignJournal(hass)
+    await journal.async_load()
+    journal.async_append("a", "cron", STATE_PENDING, 1)
+    journal.async_append("b", "cron", STATE_PENDING, 1)
+    journal.async_append("a", "cron", STATE_IN_PROGRESS, 1)
+    journal.async_append("b", "cron", STATE_DONE, 1)
+    assert journal.unfinished() == [("a", "cron", 1)]
+    await journal.async_save()
+    assert [record["key"] for record in hass_storage["safety_signing.journal"]["data"]["records"]] == ["a"]
+
+
+async def test_reload_with_backlog_signs_with_the_new_cron(hass, hass_storage) -> None:
+    """A job queued before a reload is replayed once, by the cron of the new entry."""
+    journal = SignJournal(hass)
+    await journal.async_load()
+    jobs = SignJobQueue(hass, journal)
+    old_cron = FakeCron("cron")
+    assert jobs.async_enqueue(old_cron, 1, "k1")
+
+    # Unload with the job still queued, then set the entry up again.
+    jobs.async_forget(FakeToken(old_cron))
+    old_cron.closed = True
+    new_cron = FakeCron("cron")
+    assert jobs.async_replay(FakeToken(new_cron)) == 1
+
+    jobs.async_set_workers(1)
+    await asyncio.wait_for(jobs._queue.join(), 1)
+    await jobs.async_stop()
+
+    assert old_cron.signed == []
+    assert new_cron.signed == ["k1"]
+    assert journal.unfinished() == []
+
+
+async def test_more_urgent_job_replaces_the_waiting_one(hass, hass_storage) -> None:
+    """Only the most urgent job of a cron runs."""
+    journal = SignJournal(hass)
+    await journal.async_load()
+    jobs = SignJobQueue(hass, journal)
+    cron = FakeCron("cron")
+    assert jobs.async_enqueue(cron, 2, "scheduled")
+    assert not jobs.async_enqueue(cron, 2, "again")
+    assert jobs.async_enqueue(cron, 1, "manual")
+
+    jobs.async_set_workers(1)
+    await asyncio.wait_for(jobs._queue.join(), 1)
+    await jobs.async_stop()
+
+    assert cron.signed == ["manual"]
+    assert journal.unfinished() == []
+
+
+async def test_shrinking_the_pool_lets_busy_workers_finish(hass, hass_storage) -> None:
+    """Workers signing when the pool shrinks finish and record their jobs first."""
+    journal = SignJournal(hass)
+    await journal.async_load()
+    jobs = SignJobQueue(hass, journal)
+    release = asyncio.Event()
+    crons = [FakeCron("first", release), FakeCron("second", release)]
+    jobs.async_set_workers(2)
+    for cron in crons:
+        assert jobs.async_enqueue(cron, 1, cron.cron_id)
+    await asyncio.sleep(0)
+    assert jobs.running == 2
+
+    jobs.async_set_workers(1)
+    assert jobs.metrics["workers"] == 1
+    release.set()
+    await asyncio.wait_for(jobs._queue.join(), 1)
+
+    assert [cron.published for cron in crons] == [1, 1]
+    assert journal.unfinished() == []
+    assert len(jobs._workers) == 1
+    await jobs.async_stop()
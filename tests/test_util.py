@@ -0,0 +1,184 @@
+"""Tests for the asyncio helpers of the signing pipeline."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from custom_components.safety_signing.util import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    ConcurrencyLimiter,
+    LimitExceeded,
+    SingleFlight,
+)
+
+
+def _limiter(max_waiting: int = 10) -> AdaptiveLimiter:
+    """Return a limiter between 1 and 20, cutting by half past twice the baseline."""
+    return AdaptiveLimiter(1, 20, max_waiting, tolerance=2.0, backoff=0.5)
+
+
+def test_limiter_learns_baseline_from_successes_only() -> None:
+    """A quick refusal or job acknowledgement does not lower the baseline."""
+    limiter = _limiter()
+    limiter.record(time.monotonic(), 0.5)
+    limiter.record(time.monotonic(), 0.005, success=False)
+    assert limiter.baseline == 0.5
+    limiter.record(time.monotonic(), 0.6)
+    assert limiter.limit == 20
+
+
+def test_limiter_ignores_latency_before_a_baseline() -> None:
+    """Without a successful call yet, only overload cuts the limit."""
+    limiter = _limiter()
+    limiter.record(time.monotonic(), 5.0, success=False)
+    assert limiter.baseline is None
+    assert limiter.limit == 20
+
+
+def test_limiter_cuts_once_per_wave() -> None:
+    """Calls started before a cut do not cut the limit again."""
+    limiter = _limiter()
+    started = time.monotonic()
+    limiter.record(started, 0.5)
+    limiter.record(started, 2.0)
+    assert limiter.limit == 10
+    limiter.record(started, 2.0)
+    assert limiter.limit == 10
+    limiter.record(time.monotonic(), 0.1, success=False, overloaded=True)
+    assert limiter.limit == 5
+
+
+def test_limiter_grows_by_one_per_window() -> None:
+    """The limit grows by one after `limit` calls within the tolerance."""
+    limiter = _limiter()
+    limiter.set_limit(4)
+    for _ in range(4):
+        limiter.record(time.monotonic(), 0.5)
+    assert limiter.limit == 5
+
+
+async def test_limiter_rejects_past_max_waiting() -> None:
+    """Callers over the limit are rejected once max_waiting of them wait."""
+    limiter = AdaptiveLimiter(1, 1, 1, tolerance=2.0, backoff=0.5)
+    release = asyncio.Event()
+
+    async def _hold() -> None:
+        async with limiter:
+            await release.wait()
+
+    holder = asyncio.ensure_future(_hold())
+    waiter = asyncio.ensure_future(_hold())
+    await asyncio.sleep(0)
+    with pytest.raises(LimitExceeded):
+        await limiter.__aenter__()
+    assert limiter.rejections == 1
+    release.set()
+    await asyncio.gather(holder, waiter)
+
+
+async def test_limiter_passes_on_the_slot_of_a_cancelled_waiter() -> None:
+    """A waiter cancelled right after being woken hands its slot to the next one."""
+    limiter = ConcurrencyLimiter(1)
+
+    async def _hold(release: asyncio.Event) -> None:
+        async with limiter:
+            await release.wait()
+
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(_hold(release))
+    await asyncio.sleep(0)
+    first = asyncio.ensure_future(_hold(asyncio.Event()))
+    second = asyncio.ensure_future(_hold(release))
+    await asyncio.sleep(0)
+    assert limiter.waiting == 2
+
+    # The holder leaves and wakes the first waiter, cancelled before it resumes.
+    release.set()
+    await asyncio.sleep(0)
+    assert holder.done()
+    first.cancel()
+    await asyncio.wait_for(second, 1)
+    assert first.cancelled()
+    assert limiter.active == 0
+
+
+async def test_breaker_opens_after_threshold() -> None:
+    """Consecutive failures open the breaker, a success closes it."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.STATE_CLOSED
+    breaker.stop()
+
+
+async def test_breaker_half_open_lets_one_probe() -> None:
+    """Half-open lets a single probe through, a failed probe opens it again."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.STATE_HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.failures == 2
+    assert breaker.allow()
+    breaker.stop()
+
+
+async def test_breaker_released_probe_lets_the_next_one() -> None:
+    """A probe ending without an outcome does not block the breaker half-open."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+    breaker.stop()
+
+
+async def test_single_flight_shares_one_call() -> None:
+    """Callers of the same key share one call, and one giving up does not cancel it."""
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def _call() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    first = asyncio.ensure_future(flights.async_run("key", _call))
+    second = asyncio.ensure_future(flights.async_run("key", _call))
+    await asyncio.sleep(0)
+    assert flights.in_flight("key")
+    first.cancel()
+    release.set()
+    assert await second == 1
+    assert calls == 1
+    assert not flights.in_flight("key")
+
+
+async def test_single_flight_call_owned_by_create_task() -> None:
+    """Calls are started with create_task, so their owner can cancel them."""
+    tasks: list[asyncio.Task] = []
+
+    def _create_task(target) -> asyncio.Task:
+        task = asyncio.ensure_future(target)
+        tasks.append(task)
+        return task
+
+    flights = SingleFlight(_create_task)
+    caller = asyncio.ensure_future(flights.async_run("key", lambda: asyncio.sleep(60)))
+    await asyncio.sleep(0)
+    assert len(tasks) == 1
+    tasks[0].cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    assert len(flights) == 0
+